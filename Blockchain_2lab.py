@@ -1,40 +1,143 @@
+import os
+import shutil
 import sys
+import time
+import sqlite3
+import struct
+import tempfile
+import tracemalloc
 import hashlib
-from PyQt6.QtWidgets import QApplication, QMainWindow, QPushButton, QTextEdit, QVBoxLayout, QWidget
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtWidgets import (QApplication, QHeaderView, QHBoxLayout, QLineEdit, QMainWindow, QPushButton,
+                             QTableView, QVBoxLayout, QWidget)
 
-# Транзакция моделі
+# Транзакция моделі (__slots__ — әр объектіде __dict__ жоқ; хеш 32 байт түрінде сақталады)
 class Transaction:
+    __slots__ = ("sender", "receiver", "amount", "fee", "digest")
+
     def __init__(self, sender, receiver, amount, fee):
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
         self.fee = fee
-        self.tx_hash = self.calculate_hash()
+        self.digest = hashlib.sha256(f"{sender}{receiver}{amount}{fee}".encode()).digest()
+
+    @property
+    def tx_hash(self):
+        return self.digest.hex()
 
     def calculate_hash(self):
         data = f"{self.sender}{self.receiver}{self.amount}{self.fee}"
         return hashlib.sha256(data.encode()).hexdigest()
 
-# Меркле ағашы
+    # Көп транзакцияны бір өтуде құру және хештеу: rows — (sender, receiver, amount, fee) жолдары
+    @classmethod
+    def batch(cls, rows):
+        sha256 = hashlib.sha256
+        new = object.__new__
+        transactions = []
+        append = transactions.append
+        for sender, receiver, amount, fee in rows:
+            tx = new(cls)
+            tx.sender = sender
+            tx.receiver = receiver
+            tx.amount = amount
+            tx.fee = fee
+            tx.digest = sha256(f"{sender}{receiver}{amount}{fee}".encode()).digest()
+            append(tx)
+        return transactions
+
+# Меркле ағашы (32 байттық бинарлық дайджесттер, барлық деңгейлер кэште сақталады)
 class MerkleTree:
     def __init__(self, transactions):
-        self.transactions = transactions
+        self.transactions = list(transactions)
+        self.levels = []  # levels[0] — жапырақтар, levels[-1] — түбір
         self.root = self.build_merkle_root()
 
+    @staticmethod
+    def _parent(left, right):
+        return hashlib.sha256(left + right).digest()
+
+    # Ағашты толық құру: O(n)
     def build_merkle_root(self):
-        tx_hashes = [tx.tx_hash for tx in self.transactions]
-        if not tx_hashes:
+        level = [tx.digest for tx in self.transactions]
+        if not level:
+            self.levels = []
             return None
-        while len(tx_hashes) > 1:
-            new_level = []
-            for i in range(0, len(tx_hashes), 2):
-                if i + 1 < len(tx_hashes):
-                    combined = tx_hashes[i] + tx_hashes[i+1]
-                else:
-                    combined = tx_hashes[i] + tx_hashes[i]  # Егер тақ сан болса, соңғы элементті қайталаймыз
-                new_level.append(hashlib.sha256(combined.encode()).hexdigest())
-            tx_hashes = new_level
-        return tx_hashes[0]
+        self.levels = [level]
+        sha256 = hashlib.sha256
+        while len(level) > 1:
+            if len(level) % 2:
+                level = level + [level[-1]]  # Егер тақ сан болса, соңғы элементті қайталаймыз
+            level = [sha256(pair).digest() for pair in map(bytes.__add__, level[0::2], level[1::2])]
+            self.levels.append(level)
+        return level[0].hex()
+
+    @property
+    def root_digest(self):
+        return self.levels[-1][0] if self.levels else None
+
+    # Жаңа транзакция қосу: тек оң жақ шеттегі жол қайта есептеледі — O(log n)
+    def append(self, transaction):
+        self.transactions.append(transaction)
+        if not self.levels:
+            self.levels = [[]]
+        self.levels[0].append(transaction.digest)
+        depth = 0
+        while len(self.levels[depth]) > 1:
+            level = self.levels[depth]
+            index = (len(level) - 1) // 2 * 2
+            right = level[index + 1] if index + 1 < len(level) else level[index]
+            if depth + 1 == len(self.levels):
+                self.levels.append([])
+            parents = self.levels[depth + 1]
+            parent = self._parent(level[index], right)
+            if index // 2 < len(parents):
+                parents[index // 2] = parent
+            else:
+                parents.append(parent)
+            depth += 1
+        del self.levels[depth + 1:]
+        self.root = self.levels[depth][0].hex()
+        return self.root
+
+    # Қосылу дәлелі: түбірге дейінгі (көрші дайджест, көрші сол жақта ма) жұптары
+    def get_proof(self, index):
+        if not 0 <= index < len(self.transactions):
+            raise IndexError('transaction index out of range')
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            proof.append((level[sibling] if sibling < len(level) else level[index], sibling < index))
+            index //= 2
+        return proof
+
+    # Дәлелді тексеру: tx_hash (hex) мен proof бойынша түбірді қайта есептеу
+    @staticmethod
+    def verify_proof(tx_hash, proof, root):
+        digest = bytes.fromhex(tx_hash)
+        for sibling, sibling_is_left in proof:
+            digest = MerkleTree._parent(sibling, digest) if sibling_is_left else MerkleTree._parent(digest, sibling)
+        return digest.hex() == root
+
+
+# Бұрынғы (hex жолдарын біріктіретін) толық қайта құру — бенчмарк үшін
+def legacy_merkle_root(transactions):
+    tx_hashes = [tx.tx_hash for tx in transactions]
+    if not tx_hashes:
+        return None
+    while len(tx_hashes) > 1:
+        new_level = []
+        for i in range(0, len(tx_hashes), 2):
+            if i + 1 < len(tx_hashes):
+                combined = tx_hashes[i] + tx_hashes[i+1]
+            else:
+                combined = tx_hashes[i] + tx_hashes[i]
+            new_level.append(hashlib.sha256(combined.encode()).hexdigest())
+        tx_hashes = new_level
+    return tx_hashes[0]
 
 # Блок моделі
 class Block:
@@ -48,16 +151,197 @@ class Block:
         data = f"{self.previous_hash}{self.merkle_root}"
         return hashlib.sha256(data.encode()).hexdigest()
 
+PARALLEL_VALIDATION_MIN_TXS = 20_000  # Осыдан кіші блоктар бір процесте тексеріледі
+UTXO_CACHE_SIZE = 100_000  # Жадтағы UTXO кэшінің ең көп жазба саны
+GENESIS_BALANCES = {"Alice": 100, "Bob": 100, "Charlie": 100, "Dave": 100}
+
+OUTPOINT = struct.Struct("<32sI")  # (txid, шығыс нөмірі)
+INT_AMOUNT = struct.Struct("<q")  # бүтін сома / баланс — дәл сақталады (2**53-тен үлкен мәндер де)
+FLOAT_AMOUNT = struct.Struct("<d")  # бөлшек сома (мысалы, бөлшек комиссиядан кейінгі қайтарым)
+ADDRESS_LENGTH = struct.Struct("<H")
+
+# Сома бір байтты белгімен кодталады: b"q" — int64, b"d" — float; int бұрынғыдай int болып қайтады
+def pack_amount(amount):
+    if isinstance(amount, int) and -2**63 <= amount < 2**63:
+        return b"q" + INT_AMOUNT.pack(amount)
+    return b"d" + FLOAT_AMOUNT.pack(amount)
+
+# (сома, кодталған ұзындық) қайтарады
+def unpack_amount(value):
+    if value[:1] == b"q":
+        return INT_AMOUNT.unpack_from(value, 1)[0], 1 + INT_AMOUNT.size
+    return FLOAT_AMOUNT.unpack_from(value, 1)[0], 1 + FLOAT_AMOUNT.size
+
+# Шығыстар жиыны (txid, index) -> (сома, иесі): жадта шектелген LRU кэш, дискте sqlite кілт-мән файлы.
+# Кілттер: b"o"+outpoint — шығыс, b"b"+мекенжай — баланс, b"a"+мекенжай+outpoint — мекенжай шығыстарының
+# индексі (әр шығыс жеке жазба, сондықтан шығыс қабылдау O(1), ал баланс бір қысқа жазбадан оқылады).
+class UTXOSet:
+    def __init__(self, path=None, cache_size=UTXO_CACHE_SIZE):
+        self._tempdir = None
+        if path is None:
+            self._tempdir = tempfile.mkdtemp(prefix="utxo-")
+            path = os.path.join(self._tempdir, "utxo.sqlite")
+        self.path = path
+        self.cache_size = cache_size
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS kv (key BLOB PRIMARY KEY, value BLOB) WITHOUT ROWID")
+        self._cache = OrderedDict()  # key -> bytes (None — өшірілген)
+        self._dirty = set()
+
+    def _load(self, key):
+        row = self.db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _write(self, items):
+        self.db.executemany("INSERT OR REPLACE INTO kv VALUES (?, ?)", [item for item in items if item[1] is not None])
+        self.db.executemany("DELETE FROM kv WHERE key = ?", [(key,) for key, value in items if value is None])
+
+    def _get(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = self._load(key)
+        self._cache[key] = value
+        self._evict()
+        return value
+
+    def _set(self, key, value):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        self._dirty.add(key)
+        self._evict()
+
+    # Кэш толса, ең ескі жазбалар шығарылады (өзгерген болса — дискке жазылып)
+    def _evict(self):
+        evicted = []
+        while len(self._cache) > self.cache_size:
+            key, value = self._cache.popitem(last=False)
+            if key in self._dirty:
+                self._dirty.discard(key)
+                evicted.append((key, value))
+        if evicted:
+            self._write(evicted)
+
+    # Өзгерген жазбаларды sqlite-қа жазу (commit-сіз — сол қосылымдағы сұраныстар оларды көреді)
+    def _sync(self):
+        if self._dirty:
+            self._write([(key, self._cache[key]) for key in self._dirty])
+            self._dirty.clear()
+
+    # Блок соңында өзгерген жазбаларды бір транзакциямен дискке жазу
+    def flush(self):
+        self._sync()
+        self.db.commit()
+
+    # Уақытша файл (path берілмесе) жабылғанда каталогымен бірге өшіріледі
+    def close(self):
+        self.flush()
+        self.db.close()
+        if self._tempdir is not None:
+            shutil.rmtree(self._tempdir, ignore_errors=True)
+            self._tempdir = None
+
+    @staticmethod
+    def _address_prefix(address):
+        address = address.encode()
+        return b"a" + ADDRESS_LENGTH.pack(len(address)) + address
+
+    @staticmethod
+    def balance_key(address):
+        return b"b" + address.encode()
+
+    def _balance(self, address):
+        record = self._get(self.balance_key(address))
+        return None if record is None else unpack_amount(record)[0]
+
+    def _address_outpoints(self, address):
+        self._sync()
+        prefix = self._address_prefix(address)
+        rows = self.db.execute("SELECT key FROM kv WHERE key >= ? AND key < ?",
+                               (prefix, prefix + b"\xff" * (OUTPOINT.size + 1)))
+        return [key[len(prefix):] for key, in rows]
+
+    # Мекенжай балансы (бұрынғы dict сияқты: жоқ мекенжай — None/KeyError)
+    def get(self, address, default=None):
+        balance = self._balance(address)
+        return default if balance is None else balance
+
+    def __contains__(self, address):
+        return self._balance(address) is not None
+
+    def __getitem__(self, address):
+        balance = self._balance(address)
+        if balance is None:
+            raise KeyError(address)
+        return balance
+
+    def outpoints(self, address):
+        return [OUTPOINT.unpack(outpoint) for outpoint in self._address_outpoints(address)]
+
+    def get_output(self, txid, index):
+        value = self._get(b"o" + OUTPOINT.pack(txid, index))
+        if value is None:
+            return None
+        amount, size = unpack_amount(value)
+        return amount, value[size:].decode()
+
+    def add_output(self, txid, index, owner, amount):
+        outpoint = OUTPOINT.pack(txid, index)
+        self._set(b"o" + outpoint, pack_amount(amount) + owner.encode())
+        self._set(self._address_prefix(owner) + outpoint, b"")
+        self._set(self.balance_key(owner), pack_amount((self._balance(owner) or 0) + amount))
+
+    # Мекенжайдың барлық шығыстарын жұмсау; олардың жалпы сомасын қайтарады
+    def spend_all(self, address):
+        balance = self._balance(address) or 0
+        prefix = self._address_prefix(address)
+        for outpoint in self._address_outpoints(address):
+            self._set(b"o" + outpoint, None)
+            self._set(prefix + outpoint, None)
+        self._set(self.balance_key(address), pack_amount(0))
+        return balance
+
+    # Транзакция: жіберушінің шығыстары жұмсалады, алушыға шығыс 0, жіберушіге қайтарым шығыс 1.
+    # Комиссия ешкімге түспейді (бұрынғы модельдегідей), қайтарым бұрынғыдай теріс болуы мүмкін.
+    def apply_transaction(self, tx, txid):
+        total = self.spend_all(tx.sender)
+        self.add_output(txid, 0, tx.receiver, tx.amount)
+        change = total - (tx.amount + tx.fee)
+        if change:
+            self.add_output(txid, 1, tx.sender, change)
+
+# Жіберушілер тобын тексеру (процесс пулында орындалады): баланс жетпейтін жіберушілер тізімі
+# Әр процесс UTXO файлын тек оқуға бір рет ашады да, өз жіберушілер бөлігінің баланстарын өзі оқиды
+_worker_dbs = {}
+
+def _failed_senders(path, groups):
+    db = _worker_dbs.get(path)
+    if db is None:
+        db = _worker_dbs[path] = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    failed = []
+    for sender, cost in groups:
+        row = db.execute("SELECT value FROM kv WHERE key = ?", (UTXOSet.balance_key(sender),)).fetchone()
+        if row is None or unpack_amount(row[0])[0] < cost:
+            failed.append(sender)
+    return failed
+
 # UTXO моделі
 class Blockchain:
-    def __init__(self):
+    def __init__(self, workers=None, utxo_path=None):
         self.chain = []
-        self.utxo = {"Alice": 100, "Bob": 100, "Charlie": 100, "Dave": 100}
+        self.block_index = {}  # block_hash -> тізбектегі орны (хеш бойынша іздеу үшін)
+        self.utxo = UTXOSet(utxo_path)
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
         self.create_genesis_block()
 
     def create_genesis_block(self):
         genesis_block = Block([], "0" * 64)
+        self.block_index[genesis_block.block_hash] = len(self.chain)
         self.chain.append(genesis_block)
+        for name, amount in GENESIS_BALANCES.items():
+            self.utxo.add_output(hashlib.sha256(f"genesis:{name}".encode()).digest(), 0, name, amount)
+        self.utxo.flush()
 
     # Валидация
     def validate_transaction(self, transaction):
@@ -65,18 +349,118 @@ class Blockchain:
             return False
         return True
 
-    def add_block(self, transactions):
-        for tx in transactions:
-            if not self.validate_transaction(tx):
-                print(f"Қате: {tx.sender} үшін баланс жеткіліксіз!")
-                return False
+    # Блоктың барлық транзакцияларын тексеру: алғашқы жарамсыз транзакцияны (жоқ болса None) қайтарады.
+    # Әр транзакция блоктың басындағы балансқа қарсы тексеріледі, сондықтан бір жіберушінің
+    # транзакциялары оның ең қымбат транзакциясына тең бір тексеруге келтіріледі. Үлкен блоктарда
+    # жіберушілер процестерге бөлінеді, ал баланстарды әр процесс sqlite файлынан өзі оқиды.
+    def validate_transactions(self, transactions):
+        costs = {}
         for tx in transactions:
-            self.utxo[tx.sender] -= (tx.amount + tx.fee)
-            self.utxo[tx.receiver] = self.utxo.get(tx.receiver, 0) + tx.amount
-        new_block = Block(transactions, self.chain[-1].block_hash)
+            cost = tx.amount + tx.fee
+            previous = costs.get(tx.sender)
+            if previous is None or cost > previous:
+                costs[tx.sender] = cost
+        utxo = self.utxo
+
+        if self.workers > 1 and len(transactions) >= PARALLEL_VALIDATION_MIN_TXS:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            utxo.flush()  # Процестер дискте тіркелген күйді оқиды
+            groups = list(costs.items())
+            size = -(-len(groups) // self.workers)
+            chunks = [groups[i:i + size] for i in range(0, len(groups), size)]
+            failed = {sender for chunk in self._executor.map(_failed_senders, [utxo.path] * len(chunks), chunks)
+                      for sender in chunk}
+        else:
+            failed = set()
+            for sender, cost in costs.items():
+                balance = utxo.get(sender)
+                if balance is None or balance < cost:
+                    failed.add(sender)
+
+        if failed:
+            for tx in transactions:
+                if tx.sender in failed and not self.validate_transaction(tx):
+                    return tx
+        return None
+
+    def add_block(self, transactions):
+        invalid = self.validate_transactions(transactions)
+        if invalid is not None:
+            print(f"Қате: {invalid.sender} үшін баланс жеткіліксіз!")
+            return False
+        previous_hash = self.chain[-1].block_hash
+        for position, tx in enumerate(transactions):
+            # txid тізбектегі орынға байланысты — бірдей транзакциялар әр блокта бөлек шығыс жасайды
+            txid = hashlib.sha256(f"{previous_hash}:{position}:".encode() + tx.digest).digest()
+            self.utxo.apply_transaction(tx, txid)
+        self.utxo.flush()  # Өзгерістер блок шекарасында дискке жазылады
+        new_block = Block(transactions, previous_hash)
+        self.block_index[new_block.block_hash] = len(self.chain)
         self.chain.append(new_block)
         return True
 
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self.utxo.close()
+
+# Блоктар кестесінің моделі: жолдар сұраныс бойынша (fetchMore) жүктеледі, мәтін тек көрінетін ұяшықтарға жасалады
+class BlockTableModel(QAbstractTableModel):
+    COLUMNS = ("Блок хэші", "Алдыңғы хэш", "Меркле түбірі")
+    FETCH_BATCH = 1000
+
+    def __init__(self, blockchain, parent=None):
+        super().__init__(parent)
+        self.blockchain = blockchain
+        self.loaded = min(self.FETCH_BATCH, len(blockchain.chain))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        block = self.blockchain.chain[index.row()]
+        return (block.block_hash, block.previous_hash, block.merkle_root)[index.column()]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return str(section)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.blockchain.chain)
+
+    def fetchMore(self, parent=QModelIndex()):
+        self._load_until(min(self.loaded + self.FETCH_BATCH, len(self.blockchain.chain)))
+
+    def _load_until(self, rows):
+        if rows <= self.loaded:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, rows - 1)
+        self.loaded = rows
+        self.endInsertRows()
+
+    # Жаңа блоктар: барлық жолдар жүктелген болса — тек соңына қосамыз, әйтпесе fetchMore өзі жүктейді
+    def blocks_appended(self, previous_length):
+        if self.loaded >= previous_length:
+            self._load_until(len(self.blockchain.chain))
+
+    # Хеш бойынша блоктың индексі (табылмаса — жарамсыз QModelIndex)
+    def find_hash(self, block_hash):
+        row = self.blockchain.block_index.get(block_hash.strip().lower())
+        if row is None:
+            return QModelIndex()
+        self._load_until(row + 1)
+        return self.index(row, 0)
+
 # PyQt GUI
 class BlockchainGUI(QMainWindow):
     def __init__(self):
@@ -84,21 +468,37 @@ class BlockchainGUI(QMainWindow):
         self.blockchain = Blockchain()
         self.initUI()
 
+    def closeEvent(self, event):
+        self.blockchain.close()
+        super().closeEvent(event)
+
     def initUI(self):
         self.setWindowTitle("Blockchain Explorer")
         self.setGeometry(100, 100, 600, 400)
         
-        # Виджет для отображения текста
-        self.text_area = QTextEdit(self)
-        self.text_area.setReadOnly(True)
+        # Таблица блоков (виртуализированная: рисуются только видимые строки)
+        self.model = BlockTableModel(self.blockchain, self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        
+        # Поиск блока по хэшу
+        self.search = QLineEdit(self)
+        self.search.setPlaceholderText("Блок хэші бойынша іздеу")
+        self.search.returnPressed.connect(self.find_block)
         
         # Кнопка для добавления нового блока
         self.button = QPushButton("Жаңа блок қосу", self)
         self.button.clicked.connect(self.add_block)
         
         # Лейаут для расположения виджетов
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(self.search)
         layout = QVBoxLayout()
-        layout.addWidget(self.text_area)
+        layout.addLayout(search_layout)
+        layout.addWidget(self.table)
         layout.addWidget(self.button)
         
         # Контейнер для лейаута
@@ -107,27 +507,139 @@ class BlockchainGUI(QMainWindow):
         
         # Установка центрального виджета
         self.setCentralWidget(container)
-        
-        # Обновление отображения
-        self.update_display()
 
     def add_block(self):
         # Пример транзакций
-        transactions = [Transaction("Alice", "Bob", 10, 1), Transaction("Bob", "Charlie", 5, 0.5)]
+        transactions = Transaction.batch([("Alice", "Bob", 10, 1), ("Bob", "Charlie", 5, 0.5)])
         
+        previous_length = len(self.blockchain.chain)
         if self.blockchain.add_block(transactions):
-            self.update_display()
+            self.update_display(previous_length)
+
+    def update_display(self, previous_length):
+        # Добавляем в модель только новые строки, без перестроения всей таблицы
+        self.model.blocks_appended(previous_length)
+
+    def find_block(self):
+        index = self.model.find_hash(self.search.text())
+        if not index.isValid():
+            self.statusBar().showMessage("Блок табылмады", 3000)
+            return
+        self.table.scrollTo(index, QTableView.ScrollHint.PositionAtCenter)
+        self.table.selectRow(index.row())
+
+# Бұрынғы (__dict__ бар) транзакция класы — бенчмарк үшін
+class LegacyTransaction:
+    def __init__(self, sender, receiver, amount, fee):
+        self.sender = sender
+        self.receiver = receiver
+        self.amount = amount
+        self.fee = fee
+        self.tx_hash = self.calculate_hash()
+
+    def calculate_hash(self):
+        data = f"{self.sender}{self.receiver}{self.amount}{self.fee}"
+        return hashlib.sha256(data.encode()).hexdigest()
+
+# Транзакцияның жадысы мен блок құру уақытын бұрынғы класпен салыстыру
+def benchmark_transactions(n=100_000):
+    rows = [(f"user{i}", f"user{i + 1}", i, 1) for i in range(n)]
+
+    def memory_per_tx(build):
+        tracemalloc.start()
+        transactions = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del transactions
+        return memory / n
+
+    def block_time(build_block):
+        started = time.perf_counter()
+        build_block()
+        return time.perf_counter() - started
+
+    legacy = lambda: [LegacyTransaction(*row) for row in rows]
+    batch = lambda: Transaction.batch(rows)
+    legacy_memory, batch_memory = memory_per_tx(legacy), memory_per_tx(batch)
+    # Бұрынғы блок: __dict__ транзакциялар + hex жолдарымен Меркле түбірі
+    legacy_time = min(block_time(lambda: legacy_merkle_root(legacy())) for _ in range(3))
+    batch_time = min(block_time(lambda: Block(batch(), "0" * 64)) for _ in range(3))
+    print(f"{n} транзакция: бұрынғы класс {legacy_memory:.0f} байт/транзакция, блок құру {legacy_time:.3f} с; "
+          f"__slots__ + batch {batch_memory:.0f} байт/транзакция, блок құру {batch_time:.3f} с")
+
+# Транзакцияларды тексеру бенчмаркы: бұрынғы цикл және процестер санына қарай топтық тексеру
+def _fund(blockchain, senders, amount=1000):
+    for i in range(senders):
+        blockchain.utxo.add_output(hashlib.sha256(f"fund:{i}".encode()).digest(), 0, f"user{i}", amount)
+    blockchain.utxo.flush()
+
+def benchmark_validation(n=200_000, senders=50_000):
+    blockchain = Blockchain(workers=1)
+    _fund(blockchain, senders)
+    transactions = Transaction.batch((f"user{i % senders}", f"user{(i * 7) % senders}", i % 100, 1) for i in range(n))
+
+    started = time.perf_counter()
+    for tx in transactions:
+        blockchain.validate_transaction(tx)
+    print(f"{n} транзакция, бұрынғы цикл: {time.perf_counter() - started:.3f} с")
+    blockchain.close()
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        blockchain = Blockchain(workers=workers)
+        _fund(blockchain, senders)
+        blockchain.validate_transactions(transactions)  # Процесс пулын алдын ала іске қосу
+        started = time.perf_counter()
+        blockchain.validate_transactions(transactions)
+        print(f"{n} транзакция, {workers} процесс: {time.perf_counter() - started:.3f} с")
+        blockchain.close()
+        workers *= 2
+
+# UTXO жиынының жадысы мекенжайлар санына қарай (кэш шектелгендіктен тұрақты болуы керек)
+def benchmark_utxo(account_counts=(10_000, 100_000, 1_000_000), cache_size=UTXO_CACHE_SIZE, batch=10_000):
+    for accounts in account_counts:
+        utxo = UTXOSet(cache_size=cache_size)
+        tracemalloc.start()
+        started = time.perf_counter()
+        for i in range(accounts):
+            utxo.add_output(hashlib.sha256(str(i).encode()).digest(), 0, f"user{i}", 100)
+            if i % batch == batch - 1:
+                utxo.flush()
+        utxo.flush()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{accounts} мекенжай: {time.perf_counter() - started:.1f} с, жады {current / 2**20:.1f} МБ (шыңы {peak / 2**20:.1f} МБ), "
+              f"дискте {os.path.getsize(utxo.path) / 2**20:.1f} МБ")
+        utxo.close()
+
+# Меркле ағашының бенчмаркы: бұрынғы толық қайта құру, жаңа құру және бір транзакция қосу
+def benchmark_merkle(n=100_000, appends=1000):
+    transactions = [Transaction(f"user{i}", f"user{i + 1}", i, 1) for i in range(n)]
+
+    started = time.perf_counter()
+    legacy_merkle_root(transactions)
+    legacy = time.perf_counter() - started
+
+    started = time.perf_counter()
+    tree = MerkleTree(transactions)
+    build = time.perf_counter() - started
+
+    extra = [Transaction("extra", f"user{i}", i, 1) for i in range(appends)]
+    started = time.perf_counter()
+    for tx in extra:
+        tree.append(tx)
+    append = (time.perf_counter() - started) / appends
 
-    def update_display(self):
-        # Обновляем отображаемую информацию о блоках
-        text = "Blockchain:\n"
-        for block in self.blockchain.chain:
-            text += f"Блок хэші: {block.block_hash}\n"
-            text += f"Алдыңғы хэш: {block.previous_hash}\n"
-            text += f"Меркле түбірі: {block.merkle_root}\n\n"
-        self.text_area.setText(text)
+    print(f"{n} транзакция: бұрынғы қайта құру {legacy:.3f} с, жаңа құру {build:.3f} с, "
+          f"бір транзакция қосу {append * 1e6:.1f} мкс (қайта құрудан {legacy / append:.0f} есе жылдам)")
 
 if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        benchmark_merkle()
+        benchmark_transactions()
+        benchmark_validation()
+        benchmark_utxo()
+        sys.exit()
     app = QApplication(sys.argv)
     gui = BlockchainGUI()
     gui.show()
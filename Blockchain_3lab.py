@@ -1,81 +1,215 @@
 import hashlib
 import json
+import os
+import struct
+import sys
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from collections import defaultdict
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import serialization, hashes
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from signers import SIGNERS, Signer, address_from_der, address_of, get_signer, intern_address
 
-# Деректерді хештеу функциясы
-def hash_data(data):
-    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+PARALLEL_VERIFY_MIN_TXS = 64  # Осыдан кіші топтар бір процесте тексеріледі
+SIGNATURE_CACHE_SIZE = 100_000  # Расталған қолтаңбалар кэшінің ең көп жазба саны
+DEFAULT_SIGNER = "rsa"  # Тізбектің әдепкі қолтаңба бэкенді ("rsa" немесе "ed25519")
+SYSTEM_SENDER = "Жүйе"  # Тек генезис блогында, жүйе кілтімен қол қойылған транзакция ғана жібере алады
 
-# RSA ашық және жеке кілттерін генерациялау функциясы
-def generate_key_pair():
-    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+TX_FIELDS = struct.Struct("<ddHH")  # Сома (кез келген сан, week7 сияқты), уақыт белгісі, жіберуші мен алушы ұзындықтары
+BLOCK_HEADER = struct.Struct("<Qd32s32s")  # Көрсеткіш, уақыт белгісі, алдыңғы хеш, транзакциялар хеші
+
+# Транзакцияның бинарлық кодталуы: тұрақты өрістер + ұзындығы алдында тұрған жолдар
+def encode_transaction(sender, receiver, amount, timestamp):
+    sender, receiver = sender.encode(), receiver.encode()
+    return TX_FIELDS.pack(amount, timestamp, len(sender), len(receiver)) + sender + receiver
+
+# Блок тақырыбының бинарлық кодталуы (генезистің "0" хеші 32 нөл байтқа толықтырылады)
+def encode_block_header(index, timestamp, previous_hash, transactions):
+    root = hashlib.sha256(b"".join(bytes.fromhex(tx.tx_id) for tx in transactions)).digest()
+    return BLOCK_HEADER.pack(index, timestamp, bytes.fromhex(previous_hash.rjust(64, "0")), root)
+
+# Ашық және жеке кілттерін генерациялау функциясы (әдепкі — RSA)
+def generate_key_pair(signer=DEFAULT_SIGNER):
+    private_key = get_signer(signer).generate()
     public_key = private_key.public_key()
     return private_key, public_key
 
-# Деректерді цифрлық қолтаңбамен растау функциясы
-def sign_data(private_key, data):
-    return private_key.sign(
-        json.dumps(data, sort_keys=True, default=str).encode(),
-        padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
-        hashes.SHA256(),
-    )
+# Деректерді (байттарды) цифрлық қолтаңбамен растау функциясы
+def sign_data(private_key, data, signer=DEFAULT_SIGNER):
+    return get_signer(signer).sign(private_key, data)
 
 # Қолтаңбаны тексеру функциясы
-def verify_signature(public_key, data, signature):
-    try:
-        public_key.verify(
-            signature,
-            json.dumps(data, sort_keys=True, default=str).encode(),
-            padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH),
-            hashes.SHA256(),
-        )
-        return True
-    except:
+def verify_signature(public_key, data, signature, signer=DEFAULT_SIGNER):
+    return get_signer(signer).verify(public_key, data, signature)
+
+# Процесс пулындағы тексеру: (бэкенд, DER ашық кілт, хабарлама, қолтаңба) тізімі бойынша нәтижелер
+_worker_keys = {}
+
+def _verify_batch(items):
+    results = []
+    for scheme, public_der, message, signature in items:
+        public_key = _worker_keys.get(public_der)
+        if public_key is None:
+            public_key = _worker_keys[public_der] = Signer.load_public(public_der)
+        results.append(SIGNERS[scheme].verify(public_key, message, signature))
+    return results
+
+# Қолтаңбаларды тексеру кезеңі: бүкіл блок процесс пулында параллель тексеріледі,
+# ал расталған (tx_id, қолтаңба, бэкенд, ашық кілт) жазбалары LRU кэште сақталады — mempool-ға қабылдау
+# мен блокқа қосу бір қолтаңбаны екі рет тексермейді.
+class SignatureVerifier:
+    def __init__(self, workers=None, cache_size=SIGNATURE_CACHE_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._executor = None
+        self.verified = 0
+        self.cache_hits = 0
+        self.seconds = 0.0
+
+    # Кілт пен бэкенд те кэш кілтіне кіреді: басқа кілтпен бірге келген сол қолтаңба қайта тексеріледі
+    @staticmethod
+    def _key(tx):
+        return tx.tx_id, tx.signature, tx.scheme, tx.public_der
+
+    def _cached(self, tx):
+        key = self._key(tx)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return True
         return False
 
+    def _remember(self, tx):
+        self._cache[self._key(tx)] = None
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # Бір транзакция (mempool-ға қабылдау)
+    def verify(self, tx):
+        return self.verify_many([tx])[0]
+
+    # Транзакциялар тізімі: әрқайсысы үшін True/False
+    def verify_many(self, transactions):
+        results = [True] * len(transactions)
+        pending = [i for i, tx in enumerate(transactions) if not self._cached(tx)]
+        if not pending:
+            return results
+
+        items = [(transactions[i].scheme, transactions[i].public_der, transactions[i].encoded, transactions[i].signature)
+                 for i in pending]
+        started = time.perf_counter()
+        if self.workers > 1 and len(items) >= PARALLEL_VERIFY_MIN_TXS:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            size = -(-len(items) // self.workers)
+            chunks = [items[i:i + size] for i in range(0, len(items), size)]
+            verdicts = [ok for chunk in self._executor.map(_verify_batch, chunks) for ok in chunk]
+        else:
+            verdicts = _verify_batch(items)
+        self.seconds += time.perf_counter() - started
+        self.verified += len(items)
+
+        for i, ok in zip(pending, verdicts):
+            results[i] = ok
+            if ok:
+                self._remember(transactions[i])
+        return results
+
+    def stats(self):
+        return {
+            "verified": self.verified,
+            "cache_hits": self.cache_hits,
+            "seconds": self.seconds,
+            "per_second": self.verified / self.seconds if self.seconds else 0.0,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+# Күйдің қабаты: тек өзгертілген кілттерді сақтайды, commit — ата-анаға жазу, discard — тастау.
+# Қабаттар кірістіріледі: тізбек күйі -> mempool -> блок үлгісі (немесе reorg кезіндегі тармақ)
+class StateOverlay:
+    def __init__(self, parent):
+        self.parent = parent
+        self.changes = {}
+
+    def get(self, key, default=0):
+        if key in self.changes:
+            return self.changes[key]
+        return self.parent.get(key, default)
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        self.changes[key] = value
+
+    def child(self):
+        return StateOverlay(self)
+
+    def commit(self):
+        self.parent.update(self.changes)
+        self.changes = {}
+
+    def discard(self):
+        self.changes = {}
+
+    def update(self, changes):
+        self.changes.update(changes)
+
 # Транзакция сыныбы
 class Transaction:
-    def __init__(self, sender, receiver, amount, private_key):
+    def __init__(self, sender, receiver, amount, private_key, signer=DEFAULT_SIGNER):
+        signer = get_signer(signer)
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
-        self.tx_id = hash_data({"sender": sender, "receiver": receiver, "amount": amount})
         self.timestamp = time.time()
-        self.signature = sign_data(private_key, self.to_dict())
+        self.encoded = encode_transaction(sender, receiver, amount, self.timestamp)  # Хеш, қолтаңба және тексеру үшін бір рет
+        self.tx_id = hashlib.sha256(self.encoded).hexdigest()
+        self.scheme = signer.name
+        self.public_der = signer.public_bytes(private_key.public_key())
+        self.signature = signer.sign(private_key, self.encoded)
     
     def to_dict(self):
         return {"Жіберуші": self.sender, "Алушы": self.receiver, "Сома": self.amount, "Транзакция ID": self.tx_id, "Уақыт белгісі": self.timestamp}
 
 # Блокчейн сыныбы
 class Blockchain:
-    def __init__(self, initial_balance, system_private_key, system_public_key):
+    def __init__(self, initial_balance, system_private_key, system_public_key, verifier=None, signer=DEFAULT_SIGNER):
         self.chain = []
+        self.signer = signer  # Тізбекке тек осы бэкендпен қол қойылған транзакциялар кіреді
         self.utxo = defaultdict(int)
+        self.verifier = verifier or SignatureVerifier()
+        self.system_der = Signer.public_bytes(system_public_key)
         self.create_genesis_block(initial_balance, system_private_key, system_public_key)
     
     def create_genesis_block(self, initial_balance, system_private_key, system_public_key):
-        user_address = hash_data(system_public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo,
-        ))
-        self.utxo[user_address] = initial_balance
-        genesis_tx = Transaction("Жүйе", user_address, initial_balance, system_private_key)
+        user_address = address_of(system_public_key)
+        genesis_tx = Transaction(SYSTEM_SENDER, user_address, initial_balance, system_private_key, self.signer)
         self.chain.append(self.create_block([genesis_tx]))
     
     def create_block(self, transactions):
         valid_transactions = []
-        temp_utxo = self.utxo.copy()
+        temp_utxo = StateOverlay(self.utxo)
+        signed = self.verifier.verify_many(transactions)
         
-        for tx in transactions:
-            if temp_utxo[tx.sender] >= tx.amount:
+        for tx, ok in zip(transactions, signed):
+            if not ok or tx.scheme != self.signer:
+                continue
+            if tx.sender == SYSTEM_SENDER:
+                # Жүйе тек генезисте және тек жүйе кілтімен монета шығарады
+                if self.chain or tx.public_der != self.system_der:
+                    continue
+            elif address_from_der(tx.public_der) != tx.sender or temp_utxo[tx.sender] < tx.amount:
+                continue
+            else:
                 temp_utxo[tx.sender] -= tx.amount
-                temp_utxo[tx.receiver] += tx.amount
-                valid_transactions.append(tx)
+            temp_utxo[tx.receiver] += tx.amount
+            valid_transactions.append(tx)
         
         block = {
             "Көрсеткіш": len(self.chain),
@@ -83,9 +217,11 @@ class Blockchain:
             "Транзакциялар": [tx.to_dict() for tx in valid_transactions],
             "Алдыңғы хеш": self.chain[-1]["Хеш"] if self.chain else "0",
         }
-        block["Хеш"] = hash_data(block)
+        block["Хеш"] = hashlib.sha256(encode_block_header(
+            block["Көрсеткіш"], block["Уақыт белгісі"], block["Алдыңғы хеш"], valid_transactions,
+        )).hexdigest()
         if valid_transactions:
-            self.utxo = temp_utxo
+            temp_utxo.commit()
         return block
     
     def add_block(self, transactions):
@@ -102,10 +238,7 @@ class WalletGUI:
         self.blockchain = blockchain
         self.private_key = private_key
         self.public_key = public_key
-        self.address = hash_data(public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo,
-        ))
+        self.address = address_of(public_key)
         self.root.title("Блокчейн Әмиян")
         self.create_widgets()
         self.update_balance()
@@ -133,20 +266,109 @@ class WalletGUI:
         self.balance_label.config(text=f"Баланс: {balance}")
     
     def send_transaction(self):
-        receiver = self.receiver_entry.get()
+        receiver = intern_address(self.receiver_entry.get())
         amount = int(self.amount_entry.get())
         
         if self.blockchain.get_balance(self.address) >= amount:
-            tx = Transaction(self.address, receiver, amount, self.private_key)
+            tx = Transaction(self.address, receiver, amount, self.private_key, self.blockchain.signer)
             self.blockchain.add_block([tx])
             self.update_balance()
             messagebox.showinfo("Сәтті", "Транзакция жіберілді")
         else:
             messagebox.showerror("Қате", "Жеткілікті баланс жоқ")
 
+# Қолтаңбаларды тексеру жылдамдығы: бір процесс, процесс пулы және кэштен қайта тексеру
+def benchmark_verification(n=2000, senders=20, signer=DEFAULT_SIGNER):
+    keys = [generate_key_pair(signer)[0] for _ in range(senders)]
+    transactions = [Transaction(f"user{i % senders}", f"user{i + 1}", i, keys[i % senders], signer) for i in range(n)]
+
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        verifier = SignatureVerifier(workers=workers)
+        verifier.verify_many(transactions)
+        stats = verifier.stats()
+        print(f"{n} қолтаңба ({signer}), {workers} процесс: {stats['per_second']:.0f} тексеру/с")
+        started = time.perf_counter()
+        verifier.verify_many(transactions)
+        print(f"{n} қолтаңба кэштен: {time.perf_counter() - started:.4f} с")
+        verifier.close()
+        workers *= 2
+
+# Кодтау бенчмаркы: JSON мен struct бойынша байттар саны және секундына хештер
+def benchmark_encoding(n=100_000):
+    rows = [(f"user{i}", f"user{i + 1}", i % 100, time.time()) for i in range(n)]
+
+    started = time.perf_counter()
+    json_bytes = 0
+    for sender, receiver, amount, timestamp in rows:
+        raw = json.dumps({"Жіберуші": sender, "Алушы": receiver, "Сома": amount, "Уақыт белгісі": timestamp},
+                         sort_keys=True, default=str).encode()
+        hashlib.sha256(raw).hexdigest()
+        json_bytes += len(raw)
+    json_rate = n / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    binary_bytes = 0
+    for row in rows:
+        raw = encode_transaction(*row)
+        hashlib.sha256(raw).hexdigest()
+        binary_bytes += len(raw)
+    binary_rate = n / (time.perf_counter() - started)
+
+    print(f"{n} транзакция: JSON {json_bytes / n:.0f} байт, {json_rate:.0f} хеш/с; "
+          f"struct {binary_bytes / n:.0f} байт, {binary_rate:.0f} хеш/с")
+
+# Блок күйін қолдану уақыты шоттар санына тәуелді болмауы керек: utxo.copy() + транзакциялар
+# мен StateOverlay + commit бірдей жұмыс үстінде салыстырылады
+def benchmark_block_creation(account_counts=(10_000, 100_000, 1_000_000), blocks=20, txs_per_block=10):
+    private_key, public_key = generate_key_pair("ed25519")
+    keys = [generate_key_pair("ed25519")[0] for _ in range(blocks)]
+    senders = [address_of(key.public_key()) for key in keys]
+
+    def apply(state, txs):
+        for tx in txs:
+            state[tx.sender] -= tx.amount
+            state[tx.receiver] += tx.amount
+
+    for accounts in account_counts:
+        bc = Blockchain(initial_balance=100, system_private_key=private_key, system_public_key=public_key, signer="ed25519")
+        for i in range(accounts):
+            bc.utxo[f"user{i}"] = 100
+        for sender in senders:
+            bc.utxo[sender] = 100
+        transactions = [[Transaction(sender, f"user{j}", 1, key, "ed25519") for j in range(txs_per_block)]
+                        for key, sender in zip(keys, senders)]
+
+        started = time.perf_counter()
+        for txs in transactions:
+            apply(bc.utxo.copy(), txs)
+        copy = (time.perf_counter() - started) / blocks
+
+        started = time.perf_counter()
+        for txs in transactions:
+            temp_utxo = StateOverlay(bc.utxo)
+            apply(temp_utxo, txs)
+            temp_utxo.commit()
+        overlay = (time.perf_counter() - started) / blocks
+
+        # Транзакциялар шынымен блокқа кіреді (жіберуші мекенжайы кілтінен алынған)
+        for txs in transactions:
+            bc.add_block(txs)
+        applied = sum(len(block["Транзакциялар"]) for block in bc.chain[1:])
+        print(f"{accounts} шот: utxo.copy() + қолдану {copy * 1000:.3f} мс, қабат + commit {overlay * 1000:.3f} мс, "
+              f"блоктарға кірген транзакциялар {applied}/{blocks * txs_per_block}")
+
 # Блокчейн мен әмиянды іске қосу
-private_key, public_key = generate_key_pair()
-bc = Blockchain(initial_balance=100, system_private_key=private_key, system_public_key=public_key)
-root = tk.Tk()
-gui = WalletGUI(root, bc, private_key, public_key)
-root.mainloop()
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        benchmark_encoding()
+        benchmark_block_creation()
+        for name in SIGNERS:
+            benchmark_verification(signer=name)
+        sys.exit()
+    signer = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--signer=")), DEFAULT_SIGNER)
+    private_key, public_key = generate_key_pair(signer)
+    bc = Blockchain(initial_balance=100, system_private_key=private_key, system_public_key=public_key, signer=signer)
+    root = tk.Tk()
+    gui = WalletGUI(root, bc, private_key, public_key)
+    root.mainloop()
@@ -0,0 +1,112 @@
+import contextlib
+import heapq
+import itertools
+
+# Mempool: хеш бойынша O(1) қайталануды тексеру, комиссия бойынша heap, көлем шегі.
+# key(transaction) -> (хеш, байт көлемі) — әр тізбек өз кодтауын береді (week4 — JSON, week7 — struct);
+# lock берілсе (мысалы, threading.Lock) барлық өзгерістер соның астында орындалады
+class Mempool:
+    def __init__(self, key, max_bytes, block_max_bytes, lock=None):
+        self._key = key
+        self.max_bytes = max_bytes
+        self.block_max_bytes = block_max_bytes
+        self.size_bytes = 0
+        self._entries = {}  # tx_hash -> (transaction, fee, size, seq)
+        self._by_fee = []  # (-fee, seq, tx_hash): блок үлгісі үшін (ең үлкен комиссия бірінші)
+        self._by_low_fee = []  # (fee, -seq, tx_hash): ығыстыру үшін (ең аз комиссия бірінші)
+        self._seq = itertools.count()
+        self._lock = lock if lock is not None else contextlib.nullcontext()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, transaction):
+        return self._key(transaction)[0] in self._entries
+
+    # Келу реті бойынша транзакциялар
+    def __iter__(self):
+        return iter([entry[0] for entry in list(self._entries.values())])
+
+    def _is_live(self, tx_hash, seq):
+        entry = self._entries.get(tx_hash)
+        return entry is not None and entry[3] == seq
+
+    def _drop(self, tx_hash):
+        entry = self._entries.pop(tx_hash)
+        self.size_bytes -= entry[2]
+        return entry[0]
+
+    # Жойылған жазбалар heap-та қалады (lazy deletion); олар тым көбейсе heap-ты қайта құрамыз
+    def _compact(self):
+        if len(self._by_fee) > 2 * len(self._entries) + 64:
+            self._by_fee = [(-fee, seq, tx_hash) for tx_hash, (_, fee, _, seq) in self._entries.items()]
+            self._by_low_fee = [(fee, -seq, tx_hash) for tx_hash, (_, fee, _, seq) in self._entries.items()]
+            heapq.heapify(self._by_fee)
+            heapq.heapify(self._by_low_fee)
+
+    # Транзакция қосу: (қабылданды ма, ығыстырылған транзакциялар) қайтарады
+    def add(self, transaction):
+        tx_hash, size = self._key(transaction)
+        fee = transaction.get("fee", 0)
+        with self._lock:
+            if tx_hash in self._entries or size > self.max_bytes:
+                return False, []
+
+            # Орын жетпесе — комиссиясы жаңа транзакциядан аз транзакцияларды ығыстырамыз
+            popped, freed = [], 0
+            while self.size_bytes - freed + size > self.max_bytes:
+                item = None
+                while self._by_low_fee:
+                    item = heapq.heappop(self._by_low_fee)
+                    if self._is_live(item[2], -item[1]):
+                        break
+                    item = None
+                if item is None or item[0] >= fee:
+                    for restored in popped + ([item] if item else []):
+                        heapq.heappush(self._by_low_fee, restored)
+                    return False, []
+                popped.append(item)
+                freed += self._entries[item[2]][2]
+            evicted = [self._drop(item[2]) for item in popped]
+
+            seq = next(self._seq)
+            self._entries[tx_hash] = (transaction, fee, size, seq)
+            self.size_bytes += size
+            heapq.heappush(self._by_fee, (-fee, seq, tx_hash))
+            heapq.heappush(self._by_low_fee, (fee, -seq, tx_hash))
+            self._compact()
+            return True, evicted
+
+    # Блокқа кірген транзакцияларды өшіру
+    def remove(self, transactions):
+        removed = []
+        with self._lock:
+            for transaction in transactions:
+                tx_hash = self._key(transaction)[0]
+                if tx_hash in self._entries:
+                    removed.append(self._drop(tx_hash))
+            self._compact()
+        return removed
+
+    # Блок үлгісі: комиссия бойынша кему ретімен, max_bytes (әдепкі — block_max_bytes) шегіне дейін
+    def template(self, max_bytes=None):
+        max_bytes = self.block_max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            heap = list(self._by_fee)
+            selected, used = [], 0
+            while heap:
+                _, seq, tx_hash = heapq.heappop(heap)
+                if not self._is_live(tx_hash, seq):
+                    continue
+                transaction, _, size, _ = self._entries[tx_hash]
+                if used + size > max_bytes:
+                    break
+                selected.append(transaction)
+                used += size
+            return selected
+
+    # Блок үлгісін алып, оны mempool-дан өшіру
+    def pop_template(self, max_bytes=None):
+        selected = self.template(max_bytes)
+        self.remove(selected)
+        return selected
@@ -0,0 +1,143 @@
+import abc
+import base64
+import functools
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+ADDRESS_BYTES = 20  # Мекенжай — ашық кілттің DER байттарынан SHA-256 хешінің алғашқы 20 байты
+ADDRESS_CACHE_SIZE = 10_000  # DER -> мекенжай кэшінің шегі (әмиян өз мекенжайын өзі сақтайды)
+
+# Қолтаңба интерфейсі: әр тізбек өз бэкендін таңдайды (RSA-PSS немесе Ed25519)
+class Signer(abc.ABC):
+    name = None
+
+    @abc.abstractmethod
+    def generate(self):
+        pass
+
+    @abc.abstractmethod
+    def sign(self, private_key, message):
+        pass
+
+    @abc.abstractmethod
+    def _verify(self, public_key, message, signature):
+        pass
+
+    def verify(self, public_key, message, signature):
+        try:
+            self._verify(public_key, message, signature)
+            return True
+        except InvalidSignature:
+            return False
+
+    # Ашық кілттің DER (SubjectPublicKeyInfo) байттары — транзакцияда және процесс пулында тасымалданады
+    @staticmethod
+    def public_bytes(public_key):
+        return public_key.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+
+    @staticmethod
+    def load_public(data):
+        return serialization.load_der_public_key(data)
+
+class RSASigner(Signer):
+    name = "rsa"
+
+    def __init__(self, key_size=2048):
+        self.key_size = key_size
+        self._padding = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+    def generate(self):
+        return rsa.generate_private_key(public_exponent=65537, key_size=self.key_size)
+
+    def sign(self, private_key, message):
+        return private_key.sign(message, self._padding, hashes.SHA256())
+
+    def _verify(self, public_key, message, signature):
+        public_key.verify(signature, message, self._padding, hashes.SHA256())
+
+class Ed25519Signer(Signer):
+    name = "ed25519"
+
+    def generate(self):
+        return ed25519.Ed25519PrivateKey.generate()
+
+    def sign(self, private_key, message):
+        return private_key.sign(message)
+
+    def _verify(self, public_key, message, signature):
+        public_key.verify(signature, message)
+
+SIGNERS = {signer.name: signer for signer in (RSASigner(), Ed25519Signer())}
+
+def get_signer(name):
+    try:
+        return SIGNERS[name]
+    except KeyError:
+        raise ValueError(f"Белгісіз қолтаңба бэкенді: {name} (бар: {', '.join(SIGNERS)})") from None
+
+# Мекенжайлар sys.intern арқылы ортақ жолға айналады, сондықтан баланс сөздіктерінің кілттері
+# қысқа (40 hex таңба) және бір объект болып қалады. Жиі кездесетін кілттер шектелген LRU кэште
+@functools.lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def address_from_der(public_der):
+    return sys.intern(hashlib.sha256(public_der).digest()[:ADDRESS_BYTES].hex())
+
+def address_of(public_key):
+    return address_from_der(Signer.public_bytes(public_key))
+
+# Сырттан келген мекенжай (мысалы, GUI өрісінен) — сол интерндалған объектіге келтіру
+def intern_address(address):
+    return sys.intern(address.strip())
+
+# Әр бэкенд үшін кілт генерациясы, қол қою және тексеру жылдамдығы
+def benchmark_signers(keys=20, n=1000):
+    message = b"x" * 64
+    for signer in SIGNERS.values():
+        started = time.perf_counter()
+        private_keys = [signer.generate() for _ in range(keys)]
+        keygen = keys / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        signatures = [signer.sign(private_keys[i % keys], message) for i in range(n)]
+        sign = n / (time.perf_counter() - started)
+
+        public_keys = [key.public_key() for key in private_keys]
+        started = time.perf_counter()
+        for i, signature in enumerate(signatures):
+            signer.verify(public_keys[i % keys], message, signature)
+        verify = n / (time.perf_counter() - started)
+
+        print(f"{signer.name:>8}: кілт {keygen:8.0f}/с, қол қою {sign:8.0f}/с, тексеру {verify:8.0f}/с, "
+              f"қолтаңба {len(signatures[0])} байт")
+
+def _fake_pem(i, size=294):
+    return "-----BEGIN PUBLIC KEY-----\n" + base64.encodebytes(os.urandom(size)).decode() + "-----END PUBLIC KEY-----\n"
+
+def _fake_address(i):
+    return intern_address(hashlib.sha256(str(i).encode()).digest()[:ADDRESS_BYTES].hex())
+
+# 1M мекенжай: PEM кілттері мен 20 байттық мекенжайлар бойынша сөздік жадысы және іздеу уақыты
+def benchmark_addresses(n=1_000_000):
+    for label, make in (("PEM", _fake_pem), ("мекенжай", _fake_address)):
+        tracemalloc.start()
+        balances = {make(i): 100 for i in range(n)}
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        keys = list(balances)
+        started = time.perf_counter()
+        for key in keys:
+            balances[key]
+        lookup = (time.perf_counter() - started) / n
+        print(f"{n} {label}: кілт ұзындығы {len(keys[0])}, жады {memory / 2**20:.0f} МБ, іздеу {lookup * 1e9:.0f} нс")
+
+if __name__ == "__main__":
+    benchmark_signers()
+    benchmark_addresses()
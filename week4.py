@@ -1,55 +1,668 @@
 import json
+import logging
+import os
+import sys
 import time
+import atexit
+import mmap
+import multiprocessing
+import queue
+import struct
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from operator import mul
 import requests
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from mempool import Mempool
 from uuid import uuid4
 
 
+logger = logging.getLogger(__name__)
+HASH_MASK = 2**256 - 1
+CONSENSUS_TIMEOUT = 3  # Әр нодтан тізбекті күтудің шегі (секунд)
+CONSENSUS_WORKERS = 32  # Бір уақытта сұралатын нодтар саны
+GOSSIP_TIMEOUT = 2  # Gossip хабарламасын жіберудің шегі (секунд)
+GOSSIP_BATCH_SIZE = 100  # Бір сұраныста жіберілетін транзакциялардың ең көп саны
+GOSSIP_SEEN_LIMIT = 100000  # Есте сақталатын хабарламалар саны (эхо-ны болдырмау үшін)
+BLOCK_STORE_FSYNC_EVERY = 16  # Неше блок сайын дискке fsync жасалады
+MEMPOOL_MAX_BYTES = 5_000_000  # Mempool-дың ең үлкен көлемі (транзакциялардың JSON байттары)
+BLOCK_MAX_BYTES = 1_000_000  # Бір блоктағы транзакциялардың ең үлкен көлемі
+MINING_REWARD = 1  # Майнингке берілетін сыйақы (комиссиялар бөлек қосылады)
+PROOF_TARGET = 2**240  # custom_hash(...)[:4] == '0000' <=> хеш мәні 2**240-тан кіші
+HASH_CHUNK = 4096  # _poly_hash мәтінді осындай бөліктермен өңдейді (дәрежелер кестесінің тұрақты ұзындығы)
+
+
+# 🔹 31**i mod 2**256 кестесі, i = 0..n
+def _powers_of_31(n):
+    powers = [1]
+    for _ in range(n):
+        powers.append((powers[-1] * 31) & HASH_MASK)
+    return powers
+
+
+_POWERS_OF_31 = _powers_of_31(HASH_CHUNK)  # Бір рет құрылады және өспейді
+
+
+# 🔹 Полиномдық хеш: state-тен бастап text-ті жалғастырады (Горнер ережесінсіз, бөлік сайын бір қадамда:
+# state = state * 31**k + Σ ord(c) * 31**(k-1-i) — ұзын мәтін үшін де жады шектеулі)
+def _poly_hash(text, state=0):
+    powers = _POWERS_OF_31
+    n = len(text)
+    if n <= HASH_CHUNK:  # Жиі жағдай (nonce, блок тақырыбы) — бөлусіз
+        return (state * powers[n] + sum(map(mul, map(ord, text), powers[n - 1::-1]))) & HASH_MASK
+    for start in range(0, n, HASH_CHUNK):
+        chunk = text[start:start + HASH_CHUNK]
+        n = len(chunk)
+        state = (state * powers[n] + sum(map(mul, map(ord, chunk), powers[n - 1::-1]))) & HASH_MASK
+    return state
+
+
 # 🔹 256-биттік хеш-функция (кітапханасыз)
 def custom_hash(data):
+    return format(_poly_hash(str(data)), '064x')
+
+
+# 🔹 Бастапқы (таңбалап есептейтін) нұсқа — салыстыру және бенчмарк үшін
+def reference_custom_hash(data):
     hash_value = 0
     for char in str(data):
         hash_value = (hash_value * 31 + ord(char)) % (2**256)
     return format(hash_value, '064x')
 
 
+# 🔹 Тұрақты префикстің хеш күйін сақтап, тек суффикстерді есептейтін хешер
+class PrefixHasher:
+    def __init__(self, prefix):
+        self.prefix = str(prefix)
+        self.state = _poly_hash(self.prefix)
+
+    # 🔸 prefix + suffix хешінің сандық мәні
+    def value(self, suffix):
+        return _poly_hash(str(suffix), self.state)
+
+    # 🔸 custom_hash(prefix + suffix) нәтижесімен бірдей
+    def digest(self, suffix):
+        return format(self.value(suffix), '064x')
+
+    # 🔸 Бірнеше суффиксті бір шақыруда хештеу
+    def digests(self, suffixes):
+        state = self.state
+        return [format(_poly_hash(str(suffix), state), '064x') for suffix in suffixes]
+
+    # 🔸 Хеші target-тен кіші алғашқы суффикс (табылмаса None)
+    def first_below(self, suffixes, target=PROOF_TARGET):
+        state = self.state
+        for suffix in suffixes:
+            if _poly_hash(str(suffix), state) < target:
+                return suffix
+        return None
+
+
+# 🔹 Майнинг процесінің ортақ күйі (пул процестері құрылғанда бір рет беріледі)
+_mine_best = None
+_mine_stop = None
+
+
+def _init_mine_worker(best, stop_event):
+    global _mine_best, _mine_stop
+    _mine_best, _mine_stop = best, stop_event
+
+
+# 🔹 Майнинг тапсырмасы: nonce кеңістігінің бір бөлігін (offset, offset+step, ...) тексереді
+def _mine_worker(last_proof, worker_id, step, batch_size):
+    started = time.perf_counter()
+    best, stop_event = _mine_best, _mine_stop
+    hasher = PrefixHasher(last_proof)
+    proof = worker_id
+    count = 0
+    while not stop_event.is_set():
+        limit = best.value  # Басқа процесс тапқан ең кіші proof-тан әрі іздеудің қажеті жоқ
+        if proof >= limit:
+            break
+        candidates = range(proof, min(proof + step * batch_size, limit), step)
+        found = hasher.first_below(candidates)
+        if found is not None:
+            count += (found - proof) // step + 1
+            with best.get_lock():
+                if found < best.value:
+                    best.value = found
+            break
+        count += len(candidates)
+        proof += step * len(candidates)
+    return count, time.perf_counter() - started
+
+
+# 🔹 Көп ядролы майнер (nonce кеңістігін процестерге бөлу)
+# Процестер пулы бір рет, сервер ағындары басталмай тұрып құрылады және барлық майнингтерге ортақ.
+# spawn/forkserver модульді қайта орындап, түйінді (қойманы) екінші рет ашар еді, сондықтан fork
+class ParallelMiner:
+    NOT_FOUND = 2**63 - 1
+
+    def __init__(self, workers=None, batch_size=1000):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.stats = []
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._context = multiprocessing.get_context(start_method)
+        self._best = self._context.Value('q', self.NOT_FOUND)
+        self._stop_event = self._context.Event()
+        self._lock = threading.Lock()  # best/stop ортақ — бір уақытта бір ғана майнинг
+        self._pool = None
+        self._pool_workers = 0
+        self._warned = False
+
+    # 🔸 Пулды іске қосу (workers өзгерсе — қайта құру); бір процесті майнингке пул керек емес
+    def start(self):
+        if self.workers <= 1:
+            return None
+        if self._pool is None or self._pool_workers != self.workers:
+            self.close()
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=self._context,
+                                             initializer=_init_mine_worker,
+                                             initargs=(self._best, self._stop_event))
+            self._pool_workers = self.workers
+            self._pool.submit(int).result()  # Процестерді қазір құру, /mine ағынынан емес
+        return self._pool
+
+    # 🔸 Пул дайын ба: start() сервер ағындарынан бұрын шақырылмаса, сұраныс ағынынан fork жасамаймыз —
+    # Blockchain бір процесте майнинг жасайды (бір рет ескерту жазылады)
+    def ready(self):
+        if self._pool is not None and self._pool_workers == self.workers:
+            return True
+        if not self._warned:
+            self._warned = True
+            logger.warning('mining pool was not started before serving; mining in a single process')
+        return False
+
+    # 🔸 Майнинг: табылған proof немесе тоқтатылса None қайтарады (пул start() арқылы алдын ала іске қосылады)
+    def mine(self, last_proof):
+        with self._lock:
+            if not self.ready():
+                raise RuntimeError('ParallelMiner.start() must be called before mine()')
+            pool = self._pool
+            self._best.value = self.NOT_FOUND
+            self._stop_event.clear()
+            futures = [
+                pool.submit(_mine_worker, last_proof, worker_id, self.workers, self.batch_size)
+                for worker_id in range(self.workers)
+            ]
+            results = [future.result() for future in futures]
+            cancelled = self._stop_event.is_set()
+            best = self._best.value
+
+        self.stats = [
+            {
+                'worker': worker_id,
+                'nonces': checked,
+                'seconds': elapsed,
+                'nonces_per_sec': checked / elapsed if elapsed else 0.0,
+            }
+            for worker_id, (checked, elapsed) in enumerate(results)
+        ]
+        if cancelled or best == self.NOT_FOUND:
+            return None
+        return best
+
+    # 🔸 Барлық процестерді тоқтату (мысалы, басқа нодтан блок келгенде)
+    def cancel(self):
+        self._stop_event.set()
+
+    # 🔸 Пул процестерін жабу
+    def close(self):
+        if self._pool is not None:
+            self._stop_event.set()
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_workers = 0
+
+
+# 🔹 Мекенжай балансының индексі (расталған + mempool-дағы өзгерістер)
+class BalanceIndex:
+    def __init__(self):
+        self.confirmed = {}  # Блоктардағы транзакциялар бойынша баланс
+        self.pending = {}  # Күтілетін транзакциялардың өзгерістері
+
+    @staticmethod
+    def _apply(balances, transaction, sign=1):
+        amount = transaction['amount'] * sign
+        fee = transaction.get('fee', 0) * sign  # Комиссияны жіберуші төлейді, майнер coinbase арқылы алады
+        balances[transaction['recipient']] = balances.get(transaction['recipient'], 0) + amount
+        balances[transaction['sender']] = balances.get(transaction['sender'], 0) - amount - fee
+
+    # 🔸 Блокты индекске қосу (sign=-1 болса — кері қайтару)
+    def apply_block(self, block, sign=1):
+        for transaction in block['transactions']:
+            self._apply(self.confirmed, transaction, sign)
+
+    def rollback_block(self, block):
+        self.apply_block(block, sign=-1)
+
+    # 🔸 Тізбек ауысқанда: айырмашылық басталған жерден кейінгі ескі блоктарды кері қайтарып, жаңаларын қосу
+    def replace_tail(self, old_blocks, new_blocks):
+        for block in reversed(old_blocks):
+            self.rollback_block(block)
+        for block in new_blocks:
+            self.apply_block(block)
+
+    # 🔸 Индексті нөлден қайта құру
+    def rebuild(self, chain, transactions=()):
+        self.confirmed = {}
+        self.pending = {}
+        for block in chain:
+            self.apply_block(block)
+        for transaction in transactions:
+            self.add_pending(transaction)
+
+    def add_pending(self, transaction):
+        self._apply(self.pending, transaction)
+
+    def remove_pending(self, transaction):
+        self._apply(self.pending, transaction, sign=-1)
+
+    # 🔸 O(1) баланс: include_pending=True болса, расталмаған транзакциялар да қосылады
+    def balance(self, address, include_pending=False):
+        balance = self.confirmed.get(address, 0)
+        if include_pending:
+            balance += self.pending.get(address, 0)
+        return balance
+
+
+# 🔹 Mempool кілті: транзакцияның JSON жолының хеші және көлемі (байт)
+def mempool_key(transaction):
+    raw = json.dumps(transaction, sort_keys=True)
+    return custom_hash(raw), len(raw)
+
+
+# 🔹 Фондық gossip: хабарламаларды кезекке қойып, нодтарға тұрақты байланыспен жібереді
+class Gossip:
+    def __init__(self, get_nodes, timeout=GOSSIP_TIMEOUT, batch_size=GOSSIP_BATCH_SIZE, seen_limit=GOSSIP_SEEN_LIMIT):
+        self.get_nodes = get_nodes
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.seen_limit = seen_limit
+        self.queue = queue.Queue()
+        self._seen = OrderedDict()
+        self._seen_lock = threading.Lock()
+        self._sessions = {}  # Әр нодқа бір requests.Session (connection pool)
+        self._executor = ThreadPoolExecutor(max_workers=CONSENSUS_WORKERS)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.sent = 0
+        self.failed = 0
+
+    # 🔸 Хабарлама бұрын көрілмеген болса, оны белгілеп True қайтарады
+    def mark_seen(self, key):
+        with self._seen_lock:
+            if key in self._seen:
+                return False
+            self._seen[key] = None
+            if len(self._seen) > self.seen_limit:
+                self._seen.popitem(last=False)
+            return True
+
+    def publish_transaction(self, transaction):
+        self.mark_seen(transaction['id'])
+        self._enqueue(('transaction', transaction))
+
+    def publish_block(self, block, block_hash):
+        self.mark_seen(block_hash)
+        self._enqueue(('block', block))
+
+    def _enqueue(self, item):
+        if not self.get_nodes():
+            return
+        self.queue.put(item)
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='gossip', daemon=True)
+                    self._thread.start()
+
+    # 🔸 Фондық цикл: кезектегі транзакцияларды топтап, блоктарды ретімен жібереді
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            transactions = []
+            for kind, payload in items:
+                if kind == 'transaction':
+                    transactions.append(payload)
+                    continue
+                self._flush_transactions(transactions)
+                transactions = []
+                self._send_all('/blocks/new', payload)
+            self._flush_transactions(transactions)
+
+    def _flush_transactions(self, transactions):
+        if len(transactions) == 1:
+            self._send_all('/transactions/new', transactions[0])
+        elif transactions:
+            self._send_all('/transactions/batch', {'transactions': transactions})
+
+    def _send_all(self, path, payload):
+        nodes = list(self.get_nodes())
+        list(self._executor.map(lambda node: self._send(node, path, payload), nodes))
+
+    def _session(self, node):
+        session = self._sessions.get(node)
+        if session is None:
+            session = self._sessions[node] = requests.Session()
+        return session
+
+    def _send(self, node, path, payload):
+        started = time.perf_counter()
+        try:
+            self._session(node).post(f'http://{node}{path}', json=payload, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            self.failed += 1
+            return
+        self._latencies.append(time.perf_counter() - started)
+        self.sent += 1
+
+    # 🔸 Кезек ұзындығы және жіберу уақытының статистикасы
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+        return {
+            'queue_depth': self.queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'seen': len(self._seen),
+            'latency_avg': sum(latencies) / len(latencies) if latencies else None,
+            'latency_p50': percentile(0.50),
+            'latency_p95': percentile(0.95),
+            'latency_max': latencies[-1] if latencies else None,
+        }
+
+
+# 🔹 Блоктардың тұрақты қоймасы: append-only деректер файлы + тұрақты енді (height -> offset, hash) индекс.
+# Индекс mmap арқылы оқылады, сондықтан кез келген биіктіктегі блокты немесе оның хешін оқу O(1).
+class BlockStore:
+    INDEX_ENTRY = struct.Struct('<QI32s')  # (offset, length, block hash)
+
+    def __init__(self, path, fsync_every=BLOCK_STORE_FSYNC_EVERY):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fsync_every = fsync_every
+        self._lock = threading.RLock()
+        self._data = open(os.path.join(path, 'blocks.dat'), 'a+b')
+        self._index = open(os.path.join(path, 'blocks.idx'), 'a+b')
+        self._map = None
+        self._unsynced = 0
+        self._height, self._data_size = self._recover()
+
+    # 🔸 Ашылғанда: соңғы толық жазылмаған блоктарды (құлаудан кейін) алып тастау
+    def _recover(self):
+        data_size = os.fstat(self._data.fileno()).st_size
+        height = os.fstat(self._index.fileno()).st_size // self.INDEX_ENTRY.size
+        end = 0
+        while height:
+            raw = os.pread(self._index.fileno(), self.INDEX_ENTRY.size, (height - 1) * self.INDEX_ENTRY.size)
+            offset, length, _ = self.INDEX_ENTRY.unpack(raw)
+            if offset + length <= data_size:
+                end = offset + length
+                break
+            height -= 1
+        self._index.truncate(height * self.INDEX_ENTRY.size)
+        self._data.truncate(end)
+        return height, end
+
+    def _entry(self, height):
+        end = (height + 1) * self.INDEX_ENTRY.size
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._index.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.INDEX_ENTRY.unpack_from(self._map, height * self.INDEX_ENTRY.size)
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    # 🔸 Блоктың JSON байттары (декодтаусыз)
+    def raw(self, height):
+        with self._lock:
+            offset, length, _ = self._entry(height)
+            return os.pread(self._data.fileno(), length, offset)
+
+    # 🔸 Блоктың сақталған хеші (қайта есептеусіз)
+    def block_hash(self, height):
+        if height < 0:
+            height += self._height
+        with self._lock:
+            return self._entry(height)[2].hex()
+
+    def __len__(self):
+        return self._height
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[height] for height in range(*key.indices(self._height))]
+        if key < 0:
+            key += self._height
+        if not 0 <= key < self._height:
+            raise IndexError('block height out of range')
+        return json.loads(self.raw(key))
+
+    def __iter__(self):
+        for height in range(self._height):
+            yield self[height]
+
+    # 🔸 Тек `del store[height:]` түріндегі кесуге рұқсат (reorg кезінде)
+    def __delitem__(self, key):
+        if not isinstance(key, slice) or key.stop is not None or key.step is not None:
+            raise TypeError('only tail truncation is supported')
+        self.truncate(key.indices(self._height)[0])
+
+    # Хеш берілмесе, ол Blockchain.hash сияқты JSON байттарынан есептеледі
+    def append(self, block, block_hash=None):
+        raw = json.dumps(block, sort_keys=True).encode()
+        if block_hash is None:
+            block_hash = custom_hash(raw.decode())
+        with self._lock:
+            self._data.write(raw)
+            self._index.write(self.INDEX_ENTRY.pack(self._data_size, len(raw), bytes.fromhex(block_hash)))
+            self._data.flush()
+            self._index.flush()
+            self._data_size += len(raw)
+            self._height += 1
+            self._unsynced += 1
+            if self.fsync_every and self._unsynced >= self.fsync_every:
+                self.sync()
+
+    def extend(self, blocks):
+        for block in blocks:
+            self.append(block)
+
+    def truncate(self, height):
+        with self._lock:
+            if height >= self._height:
+                return
+            offset = self._entry(height)[0]
+            self._unmap()  # mmap-ты файл қысқармай тұрып жабу керек
+            self._index.truncate(height * self.INDEX_ENTRY.size)
+            self._data.truncate(offset)
+            self._height, self._data_size = height, offset
+            self.sync()
+
+    # 🔸 Буферлерді дискке жазу (fsync)
+    def sync(self):
+        with self._lock:
+            self._data.flush()
+            self._index.flush()
+            os.fsync(self._data.fileno())
+            os.fsync(self._index.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            if self._data.closed:
+                return
+            self.sync()
+            self._unmap()
+            self._data.close()
+            self._index.close()
+
+
 # 🔹 Блокчейн класы (негізгі логика)
 class Blockchain:
-    def __init__(self):
-        self.chain = []  # Блоктар тізімі
-        self.transactions = []  # Күтілетін транзакциялар
+    def __init__(self, mining_workers=None, store_path=None, fsync_every=BLOCK_STORE_FSYNC_EVERY):
+        # Блоктар тізімі: store_path берілсе — дискідегі қойма, әйтпесе жадтағы тізім
+        self.chain = BlockStore(store_path, fsync_every) if store_path else []
+        self._hashes = []  # Жадтағы тізім үшін блок хештері (қойма хештерді индексте сақтайды)
+        self._chain_lock = threading.RLock()  # chain мен _hashes бірге өзгереді (Flask ағындары), BlockStore._lock сияқты
+        self.mempool = Mempool(mempool_key, MEMPOOL_MAX_BYTES, BLOCK_MAX_BYTES, threading.Lock())  # Күтілетін транзакциялар
         self.nodes = set()  # Желі түйіндері (nodes)
-        self.create_block(proof=1, previous_hash='0')  # Генезис блогын құру
+        self.miner = ParallelMiner(mining_workers)  # Көп ядролы майнер
+        self.balances = BalanceIndex()  # Мекенжай балансының индексі
+        self.gossip = Gossip(lambda: self.nodes)  # Фондық хабарлама таратушы
+        if self.chain:
+            self.load_state()  # Қойма қайта ашылды — JSON қайта ойнатылмайды
+        else:
+            self.create_block(proof=1, previous_hash='0')  # Генезис блогын құру
+
+    def _state_path(self):
+        return os.path.join(self.chain.path, 'balances.json')
+
+    # 🔸 Баланс индексінің суретін қоймамен бірге сақтау (алдымен қойма fsync — сурет одан озбайды)
+    def save_state(self):
+        if not isinstance(self.chain, BlockStore):
+            return
+        self.chain.sync()
+        height = len(self.chain)
+        tmp_path = self._state_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'height': height, 'hash': self.chain.block_hash(height - 1),
+                       'confirmed': self.balances.confirmed}, f)
+        os.replace(tmp_path, self._state_path())
+
+    # 🔸 Әр fsync_every блок сайын сурет жазу: SIGTERM/құлаудан кейін тек соңғы блоктар қайта ойнатылады
+    def _checkpoint(self):
+        if isinstance(self.chain, BlockStore) and self.chain.fsync_every and len(self.chain) % self.chain.fsync_every == 0:
+            self.save_state()
+
+    # 🔸 Балансты суреттен жүктеп, одан кейінгі блоктарды ғана қолдану;
+    # сурет қоймадағы тізбекке сәйкес келмесе (басқа хеш немесе биіктік) — нөлден қайта құру
+    def load_state(self):
+        try:
+            with open(self._state_path()) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        height = state.get('height', 0) if state else 0
+        if 0 < height <= len(self.chain) and state.get('hash') == self.chain.block_hash(height - 1):
+            self.balances.confirmed = state['confirmed']
+            for position in range(height, len(self.chain)):
+                self.balances.apply_block(self.chain[position])
+        else:
+            self.balances.rebuild(self.chain)
+
+    def close(self):
+        self.miner.close()
+        if isinstance(self.chain, BlockStore):
+            self.save_state()
+            self.chain.close()
 
     # 🔸 Желі түйіндерін тіркеу (басқа нодтарды қосу)
     def register_node(self, address):
         self.nodes.add(address)
 
     # 🔸 Жаңа блок жасау
-    def create_block(self, proof, previous_hash):
+    # reward_address берілсе, блоктың басына сыйақы + комиссиялар транзакциясы (coinbase) қосылады
+    def create_block(self, proof, previous_hash, reward_address=None):
+        transactions = self.mempool.pop_template()  # Комиссия бойынша таңдалған транзакциялар
+        for transaction in transactions:
+            self.balances.remove_pending(transaction)
+        if reward_address is not None:
+            fees = sum(transaction.get('fee', 0) for transaction in transactions)
+            transactions.insert(0, {'sender': '0', 'recipient': reward_address,
+                                    'amount': MINING_REWARD + fees, 'fee': 0, 'id': uuid4().hex})
         block = {
             'index': len(self.chain) + 1,
             'timestamp': time.time(),
-            'transactions': self.transactions,
+            'transactions': transactions,
             'proof': proof,
             'previous_hash': previous_hash
         }
-        self.transactions = []  # Транзакция тізімін тазарту
-        self.chain.append(block)  # Блокты блокчейнге қосу
+        block_hash = self._append_block(block)  # Блокты блокчейнге қосу
+        self.balances.apply_block(block)
+        self._checkpoint()
 
         # 🔹 Желіге жаңа блокты тарату
-        self.broadcast_block(block)
+        self.broadcast_block(block, block_hash)
         return block
 
     # 🔸 Жаңа транзакция қосу
-    def add_transaction(self, sender, recipient, amount):
-        transaction = {'sender': sender, 'recipient': recipient, 'amount': amount}
-        self.transactions.append(transaction)
+    # Mempool қабылдамаса (қайталанған немесе комиссиясы тым аз) None қайтарады
+    def add_transaction(self, sender, recipient, amount, tx_id=None, fee=0):
+        transaction = {'sender': sender, 'recipient': recipient, 'amount': amount, 'fee': fee,
+                       'id': tx_id or uuid4().hex}
+        accepted, evicted = self.mempool.add(transaction)
+        for old in evicted:
+            self.balances.remove_pending(old)
+        if not accepted:
+            return None
+        self.balances.add_pending(transaction)
 
         # 🔹 Барлық түйіндерге жаңа транзакцияны тарату
         self.broadcast_transaction(transaction)
         return self.last_block['index'] + 1
 
+    # 🔸 Басқа нодтан келген блокты қосу
+    def add_block(self, block, block_hash=None):
+        self._append_block(block, block_hash)
+        self.balances.apply_block(block)
+        self._checkpoint()
+        self._drop_confirmed([block])
+
+    # 🔸 Блокты тізбекке қосу: хеш бір рет есептеліп, блокпен бірге сақталады
+    def _append_block(self, block, block_hash=None):
+        if block_hash is None:
+            block_hash = self.hash(block)
+        with self._chain_lock:
+            if isinstance(self.chain, BlockStore):
+                self.chain.append(block, block_hash)
+            else:
+                self.chain.append(block)
+                self._hashes.append(block_hash)
+        return block_hash
+
+    def _truncate(self, fork):
+        with self._chain_lock:
+            del self.chain[fork:]
+            del self._hashes[fork:]
+
+    # 🔸 Тізбектегі блоктың хеші (position — 0-ден басталатын орын) — кэштен
+    def block_hash(self, position):
+        if isinstance(self.chain, BlockStore):
+            return self.chain.block_hash(position)
+        with self._chain_lock:
+            return self._hashes[position]
+
+    # 🔸 Блок біздің тізбекте дәл осы күйінде бар болса — оның кэштегі хеші, әйтпесе None
+    def known_hash(self, block):
+        position = block.get('index', 0) - 1
+        if 0 <= position < len(self.chain) and self.chain[position] == block:
+            return self.block_hash(position)
+        return None
+
+    # 🔸 Блоктарға кірген транзакцияларды mempool-дан алып тастау
+    def _drop_confirmed(self, blocks):
+        for block in blocks:
+            for transaction in self.mempool.remove(block['transactions']):
+                self.balances.remove_pending(transaction)
+
     # 🔸 Блок хешін есептеу
     @staticmethod
     def hash(block):
@@ -62,8 +675,11 @@ class Blockchain:
 
     # 🔸 Proof-of-Work алгоритмі (майнинг)
     def proof_of_work(self, last_proof):
+        if self.miner.workers > 1 and self.miner.ready():
+            return self.miner.mine(last_proof)
+        hasher = PrefixHasher(last_proof)
         proof = 0
-        while not self.valid_proof(last_proof, proof):
+        while hasher.value(str(proof)) >= PROOF_TARGET:
             proof += 1
         return proof
 
@@ -71,89 +687,245 @@ class Blockchain:
     @staticmethod
     def valid_proof(last_proof, proof):
         guess = f'{last_proof}{proof}'
-        return custom_hash(guess)[:4] == '0000'
+        return _poly_hash(guess) < PROOF_TARGET
 
     # 🔸 Блокчейннің дұрыстығын тексеру
     def valid_chain(self, chain):
-        last_block = chain[0]
-        current_index = 1
+        return self._validate_chain(chain) is not None
+
+    # 🔸 Тізбекті тексеріп, блок хештерінің тізімін қайтарады (жарамсыз болса None).
+    # Біздің тізбекте бар блоктар қайта хештелмейді (кэштегі хеш алынады), бірақ байланыс
+    # пен proof тексерулері әр блокқа орындалады — бұрын тексерусіз қабылданған блок та тексеріледі.
+    def _validate_chain(self, chain):
+        if not chain:
+            return []
+        hashes = [self.known_hash(chain[0]) or self.hash(chain[0])]
+        for previous, block in zip(chain, chain[1:]):
+            if block['previous_hash'] != hashes[-1]:
+                return None
+            if not self.valid_proof(previous['proof'], block['proof']):
+                return None
+            hashes.append(self.known_hash(block) or self.hash(block))
+        return hashes
+
+    # 🔸 Блок тақырыбы (header): транзакцияларсыз, тек тізбекті тексеруге керек өрістер
+    def header(self, block, block_hash=None):
+        return {
+            'index': block['index'],
+            'previous_hash': block['previous_hash'],
+            'proof': block['proof'],
+            'hash': block_hash or self.hash(block),
+        }
 
-        while current_index < len(chain):
-            block = chain[current_index]
-            if block['previous_hash'] != self.hash(last_block):
+    # 🔸 index-тен (1-ден басталады) бастап блоктар және олардың тақырыптары
+    def blocks_from(self, start=1):
+        return self.chain[max(start, 1) - 1:]
+
+    def headers_from(self, start=1):
+        start = max(start, 1)
+        with self._chain_lock:
+            return [self.header(block, self.block_hash(start - 1 + offset))
+                    for offset, block in enumerate(self.blocks_from(start))]
+
+    # 🔸 Локатор: соңғы блоктан бастап экспоненциал қадаммен алынған (index, hash) жұптары
+    def locator(self):
+        with self._chain_lock:
+            pairs = []
+            index, step = len(self.chain), 1
+            while index > 1:
+                pairs.append((index, self.block_hash(index - 1)))
+                if len(pairs) >= 10:
+                    step *= 2
+                index -= step
+            pairs.append((1, self.block_hash(0)))
+            return pairs
+
+    # 🔸 Локатордағы біздің тізбекпен сәйкес келетін алғашқы блоктың index-і (жоқ болса 0)
+    def locate(self, locator):
+        for index, block_hash in locator:
+            if 1 <= index <= len(self.chain) and self.block_hash(index - 1) == block_hash:
+                return index
+        return 0
+
+    # 🔸 Бір нодтың тізбегін жүктеу (timeout-пен)
+    @staticmethod
+    def fetch_chain(node, timeout=CONSENSUS_TIMEOUT, start=None):
+        params = {'from': start} if start is not None else None
+        response = requests.get(f'http://{node}/chain', params=params, timeout=timeout)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        return data['length'], data['chain']
+
+    # 🔸 Нодтан ортақ блоктан кейінгі тақырыптарды жүктеу
+    @staticmethod
+    def fetch_headers(node, locator, timeout=CONSENSUS_TIMEOUT):
+        params = {'locator': ','.join(f'{index}:{block_hash}' for index, block_hash in locator)}
+        response = requests.get(f'http://{node}/headers', params=params, timeout=timeout)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        return data['length'], data['from'] - 1, data['headers']
+
+    # 🔸 Барлық нодтарды параллель сұрау: жауап келген бойда (node, нәтиже) қайтарады.
+    # Мерзім тек сұрауларға қолданылады: мерзімге дейін келген жауап шақырушы алдыңғы
+    # тізбектерді қанша уақыт тексерсе де есепке алынады.
+    def _query_peers(self, fetch, timeout):
+        deadline = time.monotonic() + timeout
+
+        def timed(node):
+            return fetch(node, timeout), time.monotonic()
+
+        executor = ThreadPoolExecutor(max_workers=min(CONSENSUS_WORKERS, len(self.nodes)))
+        futures = {executor.submit(timed, node): node for node in self.nodes}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    break  # Уақытында жауап бермеген нодтар есепке алынбайды
+                for future in done:
+                    try:
+                        result, finished = future.result()
+                    except (requests.exceptions.RequestException, ValueError, KeyError):
+                        continue
+                    if result is not None and finished <= deadline:
+                        yield futures[future], result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # 🔸 Ортақ блоктан (fork) кейінгі тақырыптар тізбегін тексеру
+    def valid_headers(self, fork, headers):
+        if fork:
+            previous = self.header(self.chain[fork - 1], self.block_hash(fork - 1))
+        else:
+            previous, headers = headers[0], headers[1:]
+            if previous['index'] != 1:
+                return False
+        for header in headers:
+            if header['index'] != previous['index'] + 1:
+                return False
+            if header['previous_hash'] != previous['hash']:
                 return False
-            if not self.valid_proof(last_block['proof'], block['proof']):
+            if not self.valid_proof(previous['proof'], header['proof']):
                 return False
-            last_block = block
-            current_index += 1
+            previous = header
+        return True
 
+    # 🔸 Жүктелген блоктар тексерілген тақырыптарға сәйкес пе
+    def blocks_match_headers(self, blocks, headers):
+        if len(blocks) != len(headers):
+            return False
+        for block, header in zip(blocks, headers):
+            if self.header(block) != header:
+                return False
         return True
 
     # 🔸 Консенсус алгоритмі (ең ұзын тізбекті таңдау)
-    def resolve_conflicts(self):
-        new_chain = None
-        max_length = len(self.chain)
+    # Барлық нодтар параллель сұралады; әр тізбек келген бойда тексеріледі,
+    # ал ағымдағы ең жақсы нұсқадан ұзын емес тізбектер тексерусіз өткізіледі.
+    def resolve_conflicts(self, timeout=CONSENSUS_TIMEOUT, headers_first=False):
+        if not self.nodes:
+            return False
+        if headers_first:
+            return self.sync_headers_first(timeout)
 
-        for node in self.nodes:
-            try:
-                response = requests.get(f'http://{node}/chain')
-                if response.status_code == 200:
-                    length = response.json()['length']
-                    chain = response.json()['chain']
-
-                    if length > max_length and self.valid_chain(chain):
-                        max_length = length
-                        new_chain = chain
-            except requests.exceptions.RequestException:
-                continue
+        new_chain, new_hashes = None, None
+        max_length = len(self.chain)
+        for node, (length, chain) in self._query_peers(self.fetch_chain, timeout):
+            if length > max_length and len(chain) == length:
+                hashes = self._validate_chain(chain)
+                if hashes is not None:
+                    max_length = length
+                    new_chain, new_hashes = chain, hashes
 
         if new_chain:
-            self.chain = new_chain
+            fork = 0
+            while fork < len(self.chain) and new_hashes[fork] == self.block_hash(fork):
+                fork += 1
+            self.replace_tail(fork, new_chain[fork:], new_hashes[fork:])
             return True
 
         return False
 
-    # 🔸 Баланс есептеу (мекенжай бойынша)
-    def get_balance(self, address):
-        balance = 0
-        for block in self.chain:
-            for transaction in block['transactions']:
-                if transaction['recipient'] == address:
-                    balance += transaction['amount']
-                if transaction['sender'] == address:
-                    balance -= transaction['amount']
-        return balance
-
-    # 🔸 Жаңа транзакцияны барлық түйіндерге жіберу
-    def broadcast_transaction(self, transaction):
-        for node in self.nodes:
-            try:
-                requests.post(f'http://{node}/transactions/new', json=transaction)
-            except requests.exceptions.RequestException:
+    # 🔸 Headers-first синхрондау: алдымен тақырыптар, содан кейін тек fork-тан кейінгі блоктар.
+    # Трафик пен тексеру құны тізбек ұзындығына емес, айырмашылыққа тәуелді.
+    def sync_headers_first(self, timeout=CONSENSUS_TIMEOUT):
+        locator = self.locator()
+        candidates = []
+        for node, (length, fork, headers) in self._query_peers(
+                lambda node, timeout: self.fetch_headers(node, locator, timeout), timeout):
+            if length <= len(self.chain) or fork + len(headers) != length:
                 continue
+            # Локатор дөрекі болғандықтан, басындағы ортақ тақырыптарды өткізіп жібереміз
+            common = 0
+            while (common < len(headers) and fork + common < len(self.chain)
+                   and headers[common]['hash'] == self.block_hash(fork + common)):
+                common += 1
+            fork, headers = fork + common, headers[common:]
+            if headers and self.valid_headers(fork, headers):
+                candidates.append((length, node, fork, headers))
 
-    # 🔸 Жаңа блокты барлық түйіндерге жіберу
-    def broadcast_block(self, block):
-        for node in self.nodes:
+        for length, node, fork, headers in sorted(candidates, key=lambda candidate: candidate[0], reverse=True):
             try:
-                requests.post(f'http://{node}/blocks/new', json=block)
-            except requests.exceptions.RequestException:
+                result = self.fetch_chain(node, timeout, start=fork + 1)
+            except (requests.exceptions.RequestException, ValueError, KeyError):
                 continue
+            if result is None:
+                continue
+            _, blocks = result
+            if self.blocks_match_headers(blocks, headers):
+                self.replace_tail(fork, blocks, [header['hash'] for header in headers])
+                return True
+
+        return False
+
+    # 🔸 fork-тан кейінгі блоктарды жаңаларымен ауыстыру (баланс индексін де жаңарту)
+    def replace_tail(self, fork, blocks, hashes=None):
+        self.balances.replace_tail(self.chain[fork:], blocks)
+        self._truncate(fork)
+        for block, block_hash in zip(blocks, hashes or [None] * len(blocks)):
+            self._append_block(block, block_hash)
+        self._drop_confirmed(blocks)
+        self.save_state()
+
+    # 🔸 Блоктарды JSON байттары ретінде сериализациялау (қоймадан — декодтаусыз)
+    def serialize_blocks(self, start=1):
+        if isinstance(self.chain, BlockStore):
+            return b'[' + b','.join(self.chain.raw(height) for height in range(max(start, 1) - 1, len(self.chain))) + b']'
+        return json.dumps(self.blocks_from(start)).encode()
+
+    # 🔸 Баланс есептеу (мекенжай бойынша)
+    def get_balance(self, address, include_pending=False):
+        return self.balances.balance(address, include_pending)
+
+    # 🔸 Жаңа транзакцияны барлық түйіндерге жіберу (фондық кезек арқылы)
+    def broadcast_transaction(self, transaction):
+        self.gossip.publish_transaction(transaction)
+
+    # 🔸 Жаңа блокты барлық түйіндерге жіберу (фондық кезек арқылы)
+    def broadcast_block(self, block, block_hash=None):
+        self.gossip.publish_block(block, block_hash or self.hash(block))
 
 
 # 🔹 Flask API сервері (негізгі интерфейс)
 app = Flask(__name__)
 node_identifier = str(uuid4()).replace('-', '')  # Бірегей түйін идентификаторы
-blockchain = Blockchain()
+blockchain = Blockchain(store_path=os.environ.get('BLOCK_STORE_PATH'),
+                        fsync_every=int(os.environ.get('BLOCK_STORE_FSYNC_EVERY', BLOCK_STORE_FSYNC_EVERY)))
+atexit.register(blockchain.close)
 
 
 # 🔸 Майнинг жасау (жаңа блок құру)
 @app.route('/mine', methods=['GET'])
 def mine():
     last_block = blockchain.last_block
+    height = len(blockchain.chain)
     proof = blockchain.proof_of_work(last_block['proof'])
-    blockchain.add_transaction(sender='0', recipient=node_identifier, amount=1)
-    block = blockchain.create_block(proof, blockchain.hash(last_block))
+    if proof is None or len(blockchain.chain) != height:
+        return jsonify({'message': 'Mining interrupted by a competing block'}), 409
+    block = blockchain.create_block(proof, blockchain.block_hash(height - 1), reward_address=node_identifier)
     return jsonify(block), 200
 
 
@@ -165,10 +937,35 @@ def new_transaction():
     if not all(k in data for k in required):
         return jsonify({'error': 'Missing values'}), 400
 
-    index = blockchain.add_transaction(data['sender'], data['recipient'], data['amount'])
+    if 'id' in data and not blockchain.gossip.mark_seen(data['id']):
+        return jsonify({'message': 'Transaction already known'}), 200
+
+    index = blockchain.add_transaction(data['sender'], data['recipient'], data['amount'], data.get('id'), data.get('fee', 0))
+    if index is None:
+        return jsonify({'message': 'Transaction rejected by mempool (duplicate or fee too low)'}), 409
     return jsonify({'message': f'Transaction will be added to Block {index}'}), 201
 
 
+# 🔸 Транзакциялар тобын қабылдау (gossip арқылы)
+@app.route('/transactions/batch', methods=['POST'])
+def new_transactions_batch():
+    data = request.get_json()
+    transactions = data.get('transactions') if data else None
+    if not isinstance(transactions, list):
+        return jsonify({'error': 'Missing values'}), 400
+
+    required = ['sender', 'recipient', 'amount']
+    added = 0
+    for tx in transactions:
+        if not all(k in tx for k in required):
+            continue
+        if 'id' in tx and not blockchain.gossip.mark_seen(tx['id']):
+            continue
+        if blockchain.add_transaction(tx['sender'], tx['recipient'], tx['amount'], tx.get('id'), tx.get('fee', 0)):
+            added += 1
+    return jsonify({'message': f'{added} transactions added'}), 201
+
+
 # 🔸 Жаңа блокты қабылдау (басқа нодтардан)
 @app.route('/blocks/new', methods=['POST'])
 def new_block():
@@ -176,14 +973,67 @@ def new_block():
     if not data:
         return jsonify({'error': 'Invalid block data'}), 400
 
-    blockchain.chain.append(data)
+    block_hash = blockchain.hash(data)
+    if not blockchain.gossip.mark_seen(block_hash):
+        return jsonify({'message': 'Block already known'}), 200
+
+    blockchain.miner.cancel()  # Бәсекелес блок келді — майнингті тоқтату
+    blockchain.add_block(data, block_hash)
     return jsonify({'message': 'Block added'}), 201
 
 
-# 🔸 Блокчейнді көру (толық тізбек)
+# 🔸 Mempool жағдайы
+@app.route('/mempool', methods=['GET'])
+def mempool_status():
+    mempool = blockchain.mempool
+    return jsonify({'size': len(mempool), 'bytes': mempool.size_bytes, 'max_bytes': mempool.max_bytes}), 200
+
+
+# 🔸 Gossip кезегінің статистикасы
+@app.route('/gossip/stats', methods=['GET'])
+def gossip_stats():
+    return jsonify(blockchain.gossip.stats()), 200
+
+
+# 🔸 Соңғы майнингтің статистикасы (әр процестің nonce/сек жылдамдығы)
+@app.route('/mine/stats', methods=['GET'])
+def mining_stats():
+    return jsonify({'workers': blockchain.miner.workers, 'stats': blockchain.miner.stats}), 200
+
+
+# 🔸 Блокчейнді көру (толық тізбек немесе ?from=<index> бастап)
 @app.route('/chain', methods=['GET'])
 def full_chain():
-    return jsonify({'chain': blockchain.chain, 'length': len(blockchain.chain)}), 200
+    start = request.args.get('from', type=int)
+    length = len(blockchain.chain)
+    body = b'{"chain": ' + blockchain.serialize_blocks(start or 1) + f', "length": {length}'.encode()
+    if start is not None:
+        body += f', "from": {start}'.encode()
+    return Response(body + b'}', status=200, mimetype='application/json')
+
+
+# 🔸 Бір блокты биіктігі бойынша алу
+@app.route('/blocks/<int:index>', methods=['GET'])
+def block_by_index(index):
+    if not 1 <= index <= len(blockchain.chain):
+        return jsonify({'error': 'Block not found'}), 404
+    return jsonify(blockchain.chain[index - 1]), 200
+
+
+# 🔸 Блок тақырыптары: ?from=<index> немесе ?locator=<index>:<hash>,... (ортақ блоктан кейін)
+@app.route('/headers', methods=['GET'])
+def block_headers():
+    start = request.args.get('from', default=1, type=int)
+    locator = request.args.get('locator')
+    if locator:
+        try:
+            pairs = [(int(index), block_hash) for index, block_hash in
+                     (item.split(':', 1) for item in locator.split(',') if item)]
+        except ValueError:
+            return jsonify({'error': 'Invalid locator'}), 400
+        start = blockchain.locate(pairs) + 1
+    start = max(start, 1)
+    return jsonify({'headers': blockchain.headers_from(start), 'length': len(blockchain.chain), 'from': start}), 200
 
 
 # 🔸 Желіге түйін қосу
@@ -199,15 +1049,59 @@ def register_nodes():
 # 🔸 Консенсус алгоритмін орындау (синхронизация)
 @app.route('/nodes/resolve', methods=['GET'])
 def consensus():
-    replaced = blockchain.resolve_conflicts()
+    headers_first = request.args.get('mode') == 'headers'
+    replaced = blockchain.resolve_conflicts(headers_first=headers_first)
     return jsonify({'message': 'Chain replaced' if replaced else 'Chain is authoritative'}), 200
 
 
 # 🔸 Белгілі бір мекенжайдың балансын көру
 @app.route('/balance/<string:address>', methods=['GET'])
 def get_balance(address):
-    return jsonify({'address': address, 'balance': blockchain.get_balance(address)}), 200
+    response = {'address': address, 'balance': blockchain.get_balance(address)}
+    if request.args.get('pending', '').lower() in ('1', 'true', 'yes'):
+        response['unconfirmed_balance'] = blockchain.get_balance(address, include_pending=True)
+    return jsonify(response), 200
+
+
+# 🔸 Микро-бенчмарк: reference_custom_hash және PrefixHasher/custom_hash салыстыру
+def benchmark_custom_hash(nonces=20000, blocks=200, transactions_per_block=20):
+    results = {}
+
+    last_proof = 123456789
+    started = time.perf_counter()
+    matches = sum(reference_custom_hash(f'{last_proof}{proof}')[:4] == '0000' for proof in range(nonces))
+    reference = time.perf_counter() - started
+    hasher = PrefixHasher(last_proof)
+    started = time.perf_counter()
+    hasher.first_below(range(nonces), target=0)  # target=0 — ешбір nonce сәйкес келмейді, барлығы тексеріледі
+    fast = time.perf_counter() - started
+    results['mining'] = {'nonces': nonces, 'matches': matches, 'reference_s': reference, 'fast_s': fast,
+                         'speedup': reference / fast}
+
+    sample = [
+        json.dumps({
+            'index': index,
+            'timestamp': time.time(),
+            'transactions': [{'sender': uuid4().hex, 'recipient': uuid4().hex, 'amount': i} for i in range(transactions_per_block)],
+            'proof': index * 7919,
+            'previous_hash': custom_hash(index),
+        }, sort_keys=True)
+        for index in range(blocks)
+    ]
+    started = time.perf_counter()
+    expected = [reference_custom_hash(text) for text in sample]
+    reference = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = [custom_hash(text) for text in sample]
+    fast = time.perf_counter() - started
+    assert actual == expected
+    results['block_hash'] = {'blocks': blocks, 'reference_s': reference, 'fast_s': fast, 'speedup': reference / fast}
+    return results
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080)
+    if '--bench' in sys.argv:
+        print(json.dumps(benchmark_custom_hash(), indent=2))
+    else:
+        blockchain.miner.start()  # Майнинг процестері Flask ағындарынан бұрын құрылады
+        app.run(host='0.0.0.0', port=8080)
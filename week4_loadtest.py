@@ -0,0 +1,188 @@
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import week4
+
+ENDPOINTS = ('transactions', 'mine', 'chain', 'balance')
+ADDRESSES = 100  # Транзакциялар мен баланс сұраныстарында қолданылатын мекенжайлар саны
+
+
+# 🔹 Сұраныс жіберетін клиент: Flask test client (процесс ішінде) немесе localhost-тағы сервер
+class Client:
+    def __init__(self, base_url=None):
+        self.base_url = base_url
+        self._local = threading.local()  # Әр ағынға жеке test client / session
+
+    def request(self, method, path, body=None):
+        if self.base_url:
+            session = getattr(self._local, 'session', None)
+            if session is None:
+                session = self._local.session = requests.Session()
+            return session.request(method, self.base_url + path, json=body, timeout=30).status_code
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = week4.app.test_client()
+        return client.open(path, method=method, json=body).status_code
+
+
+# 🔹 Әр эндпоинт үшін i-ші сұраныс: (method, path, body)
+def make_request(endpoint, i):
+    if endpoint == 'transactions':
+        body = {'sender': f'user{i % ADDRESSES}', 'recipient': f'user{(i * 7 + 1) % ADDRESSES}',
+                'amount': 1, 'fee': i % 10}
+        return 'POST', '/transactions/new', body
+    if endpoint == 'mine':
+        return 'GET', '/mine', None
+    if endpoint == 'chain':
+        return 'GET', '/chain', None
+    return 'GET', f'/balance/user{i % ADDRESSES}', None
+
+
+# 🔸 Тізбекті алдын ала берілген ұзындыққа дейін толтыру
+def prepare_chain(client, chain_size, transactions_per_block):
+    if client.base_url:
+        for i in range(chain_size):
+            for j in range(transactions_per_block):
+                method, path, body = make_request('transactions', i * transactions_per_block + j)
+                client.request(method, path, body)
+            client.request('GET', '/mine')
+        return
+
+    blockchain = week4.blockchain
+    for i in range(chain_size):
+        for j in range(transactions_per_block):
+            _, _, body = make_request('transactions', i * transactions_per_block + j)
+            blockchain.add_transaction(body['sender'], body['recipient'], body['amount'], fee=body['fee'])
+        proof = blockchain.proof_of_work(blockchain.last_block['proof'])
+        blockchain.create_block(proof, blockchain.block_hash(-1), reward_address=week4.node_identifier)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+# 🔸 Бір эндпоинтты concurrency ағынмен жүктеу
+def run_endpoint(client, endpoint, requests_count, concurrency):
+    def one(i):
+        method, path, body = make_request(endpoint, i)
+        started = time.perf_counter()
+        try:
+            status = client.request(method, path, body)
+        except requests.exceptions.RequestException:
+            status = None
+        return time.perf_counter() - started, status is not None and status < 400
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in samples)
+    return {
+        'requests': requests_count,
+        'errors': sum(1 for _, ok in samples if not ok),
+        'seconds': elapsed,
+        'throughput': requests_count / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# 🔸 Алдыңғы нәтижемен салыстыру: throughput төмендеуі немесе p95 өсуі шектен асса — регрессия
+def compare(result, baseline, max_regression):
+    regressions = []
+    for endpoint, current in result['results'].items():
+        previous = baseline['results'].get(endpoint)
+        if not previous:
+            continue
+        throughput_drop = 1 - current['throughput'] / previous['throughput'] if previous['throughput'] else 0.0
+        p95_growth = current['p95_ms'] / previous['p95_ms'] - 1 if previous['p95_ms'] else 0.0
+        print(f'{endpoint:>12}: throughput {previous["throughput"]:.1f} -> {current["throughput"]:.1f} req/s, '
+              f'p95 {previous["p95_ms"]:.2f} -> {current["p95_ms"]:.2f} ms')
+        if throughput_drop > max_regression or p95_growth > max_regression:
+            regressions.append(endpoint)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='week4 Flask API жүктеме бенчмаркы')
+    parser.add_argument('--url', help='localhost-тағы сервер (мысалы http://127.0.0.1:8080); берілмесе — Flask test client')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='үтірмен бөлінген тізім: ' + ','.join(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=500, help='әр эндпоинтқа сұраныстар саны')
+    parser.add_argument('--mine-requests', type=int, default=20, help='/mine сұраныстарының саны')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--chain-size', type=int, default=200, help='жүктеме алдындағы блоктар саны')
+    parser.add_argument('--transactions-per-block', type=int, default=10)
+    parser.add_argument('--mining-workers', type=int, default=1, help='процесс ішіндегі майнер процестерінің саны')
+    parser.add_argument('--output', default='week4_loadtest_results.jsonl', help='нәтижелер жазылатын JSON Lines файлы')
+    parser.add_argument('--label', default=None, help='нәтижеге белгі (әдепкі — git describe)')
+    parser.add_argument('--baseline', help='салыстыруға арналған нәтиже файлы (соңғы жазба алынады)')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='рұқсат етілген нашарлау үлесі')
+    args = parser.parse_args(argv)
+
+    endpoints = [endpoint for endpoint in args.endpoints.split(',') if endpoint]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f'unknown endpoints: {", ".join(sorted(unknown))}')
+
+    if not args.url:
+        week4.blockchain.miner.workers = args.mining_workers
+        week4.blockchain.miner.start()
+    client = Client(args.url)
+    prepare_chain(client, args.chain_size, args.transactions_per_block)
+
+    result = {
+        'label': args.label or git_version(),
+        'timestamp': time.time(),
+        'config': {
+            'target': args.url or 'test_client',
+            'requests': args.requests,
+            'mine_requests': args.mine_requests,
+            'concurrency': args.concurrency,
+            'chain_size': args.chain_size,
+            'transactions_per_block': args.transactions_per_block,
+        },
+        'results': {},
+    }
+    for endpoint in endpoints:
+        count = args.mine_requests if endpoint == 'mine' else args.requests
+        stats = result['results'][endpoint] = run_endpoint(client, endpoint, count, args.concurrency)
+        print(f'{endpoint:>12}: {stats["throughput"]:8.1f} req/s  p50 {stats["p50_ms"]:7.2f} ms  '
+              f'p95 {stats["p95_ms"]:7.2f} ms  p99 {stats["p99_ms"]:7.2f} ms  errors {stats["errors"]}')
+
+    baseline = None
+    if args.baseline:  # Нәтиже сол файлға жазылуы мүмкін, сондықтан базалық жазбаны алдын ала оқимыз
+        with open(args.baseline) as f:
+            baseline = json.loads(f.read().strip().splitlines()[-1])
+
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(result) + '\n')
+
+    if baseline:
+        regressions = compare(result, baseline, args.max_regression)
+        if regressions:
+            print(f'Regression in: {", ".join(regressions)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,56 +1,151 @@
 import random
+import sys
+import time
+from fractions import Fraction
 
+# Индекс стейков на дереве Фенвика: изменение стейка и взвешенный выбор за O(log n)
+class StakeIndex:
+    def __init__(self):
+        self.tree = [0]  # 1-индексация
+        self.stakes = []
+        self.total = 0
+
+    def __len__(self):
+        return len(self.stakes)
+
+    def append(self, stake):
+        i = len(self.tree)
+        value, step = stake, 1
+        while step < (i & -i):
+            value += self.tree[i - step]
+            step <<= 1
+        self.tree.append(value)
+        self.stakes.append(stake)
+        self.total += stake
+        return i - 1
+
+    def add(self, position, delta):
+        self.stakes[position] += delta
+        self.total += delta
+        i = position + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    # Первая позиция, у которой накопленная сумма >= value (как в линейном проходе)
+    def find(self, value):
+        position, step = 0, 1 << (len(self.stakes).bit_length() - 1)
+        while step:
+            nxt = position + step
+            if nxt < len(self.tree) and self.tree[nxt] < value:
+                position = nxt
+                value -= self.tree[nxt]
+            step >>= 1
+        return min(position, len(self.stakes) - 1)
+
+# Вознаграждения распределяются через накопитель «награда на единицу стейка»:
+# add_reward — O(1), доля держателя считается лениво как stake * reward_per_stake - reward_debt.
+# Держатель None — собственный стейк валидатора
 class Validator:
-    def _init_(self, name, stake=0):
+    def __init__(self, name, stake=0):
         self.name = name
         self.stake = stake
+        self.own_stake = stake
         self.rewards = 0
         self.delegators = {}
+        self.reward_per_stake = 0
+        self.reward_debt = {}  # holder -> stake * reward_per_stake на момент последнего расчёта
+        self.unclaimed = {}  # holder -> рассчитанная, но не выплаченная награда
+        self.undistributed = 0  # Награды, пришедшие при нулевом стейке
+
+    def staked(self, holder=None):
+        return self.own_stake if holder is None else self.delegators.get(holder, 0)
+
+    def pending_reward(self, holder=None):
+        return (self.unclaimed.get(holder, 0) + self.staked(holder) * self.reward_per_stake
+                - self.reward_debt.get(holder, 0))
+
+    # Перед изменением стейка фиксируем накопленную награду по старому стейку
+    def _settle(self, holder):
+        self.unclaimed[holder] = self.pending_reward(holder)
 
     def add_stake(self, amount, delegator=None):
+        self._settle(delegator)
         self.stake += amount
         if delegator:
             if delegator in self.delegators:
                 self.delegators[delegator] += amount
             else:
                 self.delegators[delegator] = amount
+        else:
+            self.own_stake += amount
+        self.reward_debt[delegator] = self.staked(delegator) * self.reward_per_stake
 
     def add_reward(self, amount):
         self.rewards += amount
-        # Распределение вознаграждений между делегаторами
-        if self.delegators:
-            for delegator, staked_amount in self.delegators.items():
-                delegator_reward = amount * (staked_amount / self.stake)
-                print(f"Delegator {delegator} received reward: {delegator_reward:.2f}")
+        if self.stake > 0:
+            self.reward_per_stake += amount / self.stake
+        else:
+            self.undistributed += amount
+
+    def claim_reward(self, holder=None):
+        amount = self.pending_reward(holder)
+        self.unclaimed[holder] = 0
+        self.reward_debt[holder] = self.staked(holder) * self.reward_per_stake
+        return amount
 
 class Blockchain:
-    def _init_(self):
+    def __init__(self):
         self.validators = []
+        self.validator_positions = {}  # name -> позиция в self.validators и в stake_index
+        self.stake_index = StakeIndex()
         self.transactions = []
         self.blocks = []
         self.transaction_fee = 1  # Условная комиссия за транзакцию
 
     def add_validator(self, validator):
+        self.validator_positions[validator.name] = self.stake_index.append(validator.stake)
         self.validators.append(validator)
 
+    def get_validator(self, name):
+        position = self.validator_positions.get(name)
+        return None if position is None else self.validators[position]
+
+    # Все изменения стейка идут через блокчейн, чтобы индекс оставался согласованным
+    def add_stake(self, validator_name, amount, delegator=None):
+        position = self.validator_positions.get(validator_name)
+        if position is None:
+            return None
+        validator = self.validators[position]
+        validator.add_stake(amount, delegator)
+        self.stake_index.add(position, amount)
+        return validator
+
+    def undelegate_stake(self, delegator, validator_name, amount):
+        validator = self.get_validator(validator_name)
+        if validator is None or validator.staked(delegator) < amount:
+            print(f'{delegator} cannot withdraw {amount} coins from {validator_name}')
+            return False
+        self.add_stake(validator_name, -amount, delegator)
+        print(f'{delegator} withdrew {amount} coins from {validator_name}')
+        return True
+
+    def claim_reward(self, validator_name, delegator=None):
+        validator = self.get_validator(validator_name)
+        return 0 if validator is None else validator.claim_reward(delegator)
+
     def delegate_stake(self, delegator, validator_name, amount):
-        for validator in self.validators:
-            if validator.name == validator_name:
-                validator.add_stake(amount, delegator)
-                print(f'{delegator} delegated {amount} coins to {validator_name}')
-                return
-        print(f'Validator {validator_name} not found.')
+        if self.add_stake(validator_name, amount, delegator) is None:
+            print(f'Validator {validator_name} not found.')
+            return
+        print(f'{delegator} delegated {amount} coins to {validator_name}')
 
     def select_validator(self):
-        total_stake = sum(v.stake for v in self.validators)
-        if total_stake == 0:
+        total_stake = self.stake_index.total
+        if total_stake <= 0:
             return None
         choice = random.uniform(0, total_stake)
-        cumulative = 0
-        for validator in self.validators:
-            cumulative += validator.stake
-            if cumulative >= choice:
-                return validator
+        return self.validators[self.stake_index.find(choice)]
 
     def validate_transaction(self, transaction):
         # Проверка транзакции (баланс, формат, подпись)
@@ -82,23 +177,128 @@ class Blockchain:
         print("\n=== Blockchain Status ===")
         for validator in self.validators:
             print(f"Validator {validator.name}: Stake={validator.stake}, Rewards={validator.rewards}")
+            print(f"  Own stake={validator.own_stake}, pending reward={validator.pending_reward():.2f}")
             if validator.delegators:
                 print(f"  Delegators: {validator.delegators}")
+                for delegator in validator.delegators:
+                    print(f"  Delegator {delegator}: pending reward={validator.pending_reward(delegator):.2f}")
         print("=========================")
 
-# Пример использования
-blockchain = Blockchain()
-blockchain.add_validator(Validator('Alice', 50))
-blockchain.add_validator(Validator('Bob', 30))
-blockchain.delegate_stake('Charlie', 'Alice', 20)
+# Прежний выбор: сумма стейков и линейный проход на каждый блок (для бенчмарка и сравнения)
+def legacy_select_validator(validators):
+    total_stake = sum(v.stake for v in validators)
+    if total_stake == 0:
+        return None
+    choice = random.uniform(0, total_stake)
+    cumulative = 0
+    for validator in validators:
+        cumulative += validator.stake
+        if cumulative >= choice:
+            return validator
+
+def benchmark_stake_index(n=100_000, draws=1000, updates=10_000):
+    blockchain = Blockchain()
+    for i in range(n):
+        blockchain.add_validator(Validator(f'v{i}', random.randint(1, 1000)))
+
+    started = time.perf_counter()
+    for _ in range(draws // 10):
+        legacy_select_validator(blockchain.validators)
+    legacy = (time.perf_counter() - started) / (draws // 10)
+
+    started = time.perf_counter()
+    for _ in range(draws):
+        blockchain.select_validator()
+    select = (time.perf_counter() - started) / draws
+
+    started = time.perf_counter()
+    for i in range(updates):
+        blockchain.add_stake(f'v{i % n}', 1, delegator=f'd{i}')
+    update = (time.perf_counter() - started) / updates
+
+    print(f"{n} validators: legacy select {legacy * 1e6:.0f} us, indexed select {select * 1e6:.1f} us, "
+          f"stake update {update * 1e6:.1f} us")
+
+    # Распределение совпадает с линейным выбором (небольшой набор, много выборок)
+    small = Blockchain()
+    for i, stake in enumerate((50, 30, 0, 15, 5)):
+        small.add_validator(Validator(f's{i}', stake))
+    samples = 200_000
+    indexed = {v.name: 0 for v in small.validators}
+    legacy = dict(indexed)
+    for _ in range(samples):
+        indexed[small.select_validator().name] += 1
+        legacy[legacy_select_validator(small.validators).name] += 1
+    for v in small.validators:
+        print(f"  {v.name} stake={v.stake}: indexed {indexed[v.name] / samples:.3f}, legacy {legacy[v.name] / samples:.3f}, "
+              f"expected {v.stake / small.stake_index.total:.3f}")
+
+# Прежняя выплата: цикл по всем делегаторам на каждую награду (для бенчмарка)
+def legacy_add_reward(validator, amount):
+    validator.rewards += amount
+    return {delegator: amount * (staked / validator.stake) for delegator, staked in validator.delegators.items()}
+
+# Накопитель против точного пропорционального распределения (Fraction) при случайных
+# изменениях стейка, наградах и выплатах; затем время одной награды при 100k делегаторов
+def benchmark_rewards(steps=5000, holders=50, delegators=100_000):
+    validator = Validator('V', 100)
+    exact = {None: Fraction(0)}
+    stakes = {None: Fraction(100)}
+    claimed = {None: 0}
+    for step in range(steps):
+        holder = random.choice([None] + [f'd{i}' for i in range(holders)])
+        action = random.random()
+        if action < 0.4:
+            amount = random.randint(1, 100)
+            total = sum(stakes.values())
+            for h, stake in stakes.items():
+                exact[h] += Fraction(amount) * stake / total
+            validator.add_reward(amount)
+        elif action < 0.8 or validator.staked(holder) == 0:
+            amount = random.randint(1, 50)
+            stakes[holder] = stakes.get(holder, 0) + amount
+            exact.setdefault(holder, Fraction(0))
+            validator.add_stake(amount, holder)
+        elif action < 0.9:
+            amount = random.randint(1, validator.staked(holder))
+            stakes[holder] -= amount
+            validator.add_stake(-amount, holder)
+        else:
+            claimed[holder] = claimed.get(holder, 0) + validator.claim_reward(holder)
+    error = max(abs(claimed.get(h, 0) + validator.pending_reward(h) - float(value)) for h, value in exact.items())
+    print(f"{steps} steps: max deviation from exact pro-rata {error:.2e} (total rewards {validator.rewards})")
+
+    validator = Validator('V', 100)
+    for i in range(delegators):
+        validator.add_stake(random.randint(1, 100), f'd{i}')
+    started = time.perf_counter()
+    legacy_add_reward(validator, 10)
+    legacy = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(1000):
+        validator.add_reward(10)
+    accumulator = (time.perf_counter() - started) / 1000
+    print(f"{delegators} delegators: legacy reward {legacy * 1000:.1f} ms, accumulator {accumulator * 1e6:.2f} us")
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        benchmark_stake_index()
+        benchmark_rewards()
+        sys.exit()
+
+    # Пример использования
+    blockchain = Blockchain()
+    blockchain.add_validator(Validator('Alice', 50))
+    blockchain.add_validator(Validator('Bob', 30))
+    blockchain.delegate_stake('Charlie', 'Alice', 20)
 
-blockchain.transactions.append({'from': 'Alice', 'to': 'Bob', 'amount': 10})
-blockchain.transactions.append({'from': 'Bob', 'to': 'Charlie', 'amount': 5})
+    blockchain.transactions.append({'from': 'Alice', 'to': 'Bob', 'amount': 10})
+    blockchain.transactions.append({'from': 'Bob', 'to': 'Charlie', 'amount': 5})
 
-validator = blockchain.select_validator()
-if validator:
-    blockchain.create_block(validator)
-else:
-    print('No validator selected.')
+    validator = blockchain.select_validator()
+    if validator:
+        blockchain.create_block(validator)
+    else:
+        print('No validator selected.')
 
-blockchain.show_status()
+    blockchain.show_status()
@@ -0,0 +1,233 @@
+import argparse
+import contextlib
+import io
+import math
+import random
+import sys
+
+import numpy as np
+
+import week5
+import week7
+
+
+# Монте-Карло модель PoS: расписание предлагающих генерируется пачками, награды и делегирование —
+# векторно. Внутри пачки стейки постоянны; при compound=True награды добавляются к стейку после пачки
+class Simulation:
+    def __init__(self, own_stakes, delegations=(), reward=10, compound=False, seed=None):
+        self.own = np.asarray(own_stakes, dtype=np.float64).copy()
+        # delegations: (индекс валидатора, стейк) на каждого делегатора
+        delegations = list(delegations)
+        self.delegator_validator = np.array([v for v, _ in delegations], dtype=np.int64)
+        self.delegator_stake = np.array([s for _, s in delegations], dtype=np.float64)
+        self.reward = reward
+        self.compound = compound
+        self.rng = np.random.default_rng(seed)
+
+        n = len(self.own)
+        self.blocks = np.zeros(n, dtype=np.int64)
+        self.expected_blocks = np.zeros(n)
+        self.own_rewards = np.zeros(n)
+        self.delegator_rewards = np.zeros(len(self.delegator_stake))
+        self.batch_counts = []
+
+    def stakes(self):
+        delegated = np.bincount(self.delegator_validator, weights=self.delegator_stake, minlength=len(self.own))
+        return self.own + delegated
+
+    # Как week5.Blockchain.select_validator: первый валидатор с накопленной суммой >= равномерной точки
+    def draw(self, stakes, size):
+        cumulative = np.cumsum(stakes)
+        choices = self.rng.uniform(0, cumulative[-1], size=size)
+        return np.minimum(np.searchsorted(cumulative, choices, side='left'), len(stakes) - 1)
+
+    def run(self, blocks, batch_size=100_000):
+        remaining = blocks
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            stakes = self.stakes()
+            counts = np.bincount(self.draw(stakes, size), minlength=len(stakes))
+            self.expected_blocks += size * stakes / stakes.sum()
+            self.blocks += counts
+            self.batch_counts.append(counts)
+            self._apply_rewards(counts * self.reward, stakes)
+            remaining -= size
+        return self
+
+    # Награда валидатора делится пропорционально стейку между ним и его делегаторами
+    def _apply_rewards(self, rewards, stakes):
+        per_stake = np.divide(rewards, stakes, out=np.zeros_like(rewards, dtype=np.float64), where=stakes > 0)
+        own = self.own * per_stake
+        delegated = self.delegator_stake * per_stake[self.delegator_validator]
+        self.own_rewards += own
+        self.delegator_rewards += delegated
+        if self.compound:
+            self.own += own
+            self.delegator_stake += delegated
+
+    def statistics(self):
+        stakes = self.stakes()
+        batches = np.array(self.batch_counts) * self.reward
+        shares = np.sort(stakes / stakes.sum())
+        cumulative = np.cumsum(shares[::-1])
+        return {
+            'blocks': self.blocks,
+            'fairness': np.divide(self.blocks, self.expected_blocks, out=np.zeros(len(stakes)),
+                                  where=self.expected_blocks > 0),
+            'reward_mean': batches.mean(axis=0),
+            'reward_std': batches.std(axis=0),
+            'final_share': stakes / stakes.sum(),
+            'gini': 1 - 2 * np.sum(np.cumsum(shares)) / len(shares) + 1 / len(shares),
+            'hhi': float(np.sum(shares ** 2)),
+            'nakamoto': int(np.searchsorted(cumulative, 0.5, side='right') + 1),
+        }
+
+
+# Критерий хи-квадрат однородности двух выборок; p-значение по приближению Уилсона–Хилферти
+def chi_square(counts_a, counts_b):
+    counts_a, counts_b = np.asarray(counts_a, dtype=np.float64), np.asarray(counts_b, dtype=np.float64)
+    mask = (counts_a + counts_b) > 0
+    counts_a, counts_b = counts_a[mask], counts_b[mask]
+    total_a, total_b = counts_a.sum(), counts_b.sum()
+    pooled = (counts_a + counts_b) / (total_a + total_b)
+    statistic = np.sum((counts_a - total_a * pooled) ** 2 / (total_a * pooled)
+                       + (counts_b - total_b * pooled) ** 2 / (total_b * pooled))
+    dof = len(counts_a) - 1
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / np.sqrt(2 / (9 * dof))
+    return statistic, dof, z, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _scalar_week5(stakes, blocks):
+    blockchain = week5.Blockchain()
+    for i, stake in enumerate(stakes):
+        blockchain.add_validator(week5.Validator(f'v{i}', stake))
+    counts = np.zeros(len(stakes), dtype=np.int64)
+    for _ in range(blocks):
+        counts[blockchain.validator_positions[blockchain.select_validator().name]] += 1
+    return counts
+
+
+def _scalar_week7(stakes, blocks):
+    blockchain = week7.Blockchain(validators={f'v{i}': stake for i, stake in enumerate(stakes)})
+    start = len(blockchain.chain)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(blocks):
+            blockchain.mine_block_pos()
+    names = {f'v{i}': i for i in range(len(stakes))}
+    return np.bincount([names[block['validator']] for block in blockchain.chain[start:]], minlength=len(stakes))
+
+
+# Награды делегаторов за blocks блоков (пачками по batch_size) на скалярном week5.Blockchain:
+# блок за блоком через select_validator/create_block (награда блока 10, как в Simulation по умолчанию).
+# При compound=True после каждой пачки награды забираются и добавляются к стейку, как в Simulation
+def _scalar_week5_rewards(stakes, delegations, blocks, batch_size, compound, seed):
+    random.seed(seed)
+    blockchain = week5.Blockchain()
+    blockchain.transaction_fee = 0  # Одна транзакция-заглушка на блок, без комиссии
+    holders = [(f'v{v}', f'd{j}') for j, (v, _) in enumerate(delegations)]
+    claimed = np.zeros(len(delegations))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, stake in enumerate(stakes):
+            blockchain.add_validator(week5.Validator(f'v{i}', stake))
+        for (name, delegator), (_, stake) in zip(holders, delegations):
+            blockchain.delegate_stake(delegator, name, stake)
+
+        remaining = blocks
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            for _ in range(size):
+                blockchain.transactions.append({'from': 'a', 'to': 'b', 'amount': 1})
+                blockchain.create_block(blockchain.select_validator())
+            if compound:
+                for validator in blockchain.validators:
+                    blockchain.add_stake(validator.name, blockchain.claim_reward(validator.name))
+                for j, (name, delegator) in enumerate(holders):
+                    amount = blockchain.claim_reward(name, delegator)
+                    claimed[j] += amount
+                    blockchain.add_stake(name, amount, delegator)
+            remaining -= size
+    return claimed + [blockchain.get_validator(name).pending_reward(delegator) for name, delegator in holders]
+
+
+# t-статистика Уэлча для средних наград по независимым прогонам (по каждому делегатору)
+def welch_t(a, b):
+    variance = a.var(axis=0, ddof=1) / len(a) + b.var(axis=0, ddof=1) / len(b)
+    return np.divide(a.mean(axis=0) - b.mean(axis=0), np.sqrt(variance),
+                     out=np.zeros(a.shape[1]), where=variance > 0)
+
+
+# Наибольшее отношение дисперсий (F, не меньше 1) — реинвестирование почти не меняет средние,
+# но заметно увеличивает разброс наград
+def variance_ratio(a, b):
+    var_a, var_b = a.var(axis=0, ddof=1), b.var(axis=0, ddof=1)
+    mask = (var_a > 0) & (var_b > 0)
+    return float(np.exp(np.abs(np.log(var_a[mask] / var_b[mask]))).max()) if mask.any() else 1.0
+
+
+# Сверка с week5/week7: распределение предлагающих (хи-квадрат) и награды делегаторов против
+# скалярного week5.Blockchain — средние (t Уэлча) и разброс (F) по независимым прогонам, с реинвестированием и без
+# (при compound=True награды зависят от всей истории прогона, поэтому сравниваются прогоны, а не пачки)
+def check(validators=20, blocks=50_000, z_limit=3.09, runs=40, run_blocks=5000, batch_size=500, t_limit=4.5,
+          f_limit=4.0, seed=None):
+    rng = np.random.default_rng(seed)
+    stakes = rng.integers(1, 100, size=validators).tolist()
+    simulated = Simulation(stakes, seed=seed).run(blocks).blocks
+
+    ok = True
+    for label, scalar in (('week5', _scalar_week5), ('week7', _scalar_week7)):
+        statistic, dof, z, p_value = chi_square(simulated, scalar(stakes, blocks))
+        passed = z < z_limit
+        ok &= passed
+        print(f'{label}: chi2={statistic:.1f} dof={dof} p={p_value:.3f} -> {"ok" if passed else "MISMATCH"}')
+
+    delegations = [(int(rng.integers(validators)), float(rng.integers(1, 50))) for _ in range(5 * validators)]
+    seeds = [int(value) for value in rng.integers(2**32, size=runs)]
+    for compound in (False, True):
+        vectorized = np.array([Simulation(stakes, delegations, compound=compound, seed=run_seed)
+                               .run(run_blocks, batch_size).delegator_rewards for run_seed in seeds])
+        scalar = np.array([_scalar_week5_rewards(stakes, delegations, run_blocks, batch_size, compound, run_seed)
+                           for run_seed in seeds])
+        t = np.abs(welch_t(vectorized, scalar)).max()
+        f = variance_ratio(vectorized, scalar)
+        passed = t < t_limit and f < f_limit
+        ok &= passed
+        print(f'delegator rewards vs week5.Blockchain (compound={compound}): {runs} runs x {run_blocks} blocks, '
+              f'max |t|={t:.2f} max F={f:.2f} over {len(delegations)} delegators -> {"ok" if passed else "MISMATCH"}')
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Vectorized PoS simulation (week5/week7 model)')
+    parser.add_argument('--validators', type=int, default=1000)
+    parser.add_argument('--delegators', type=int, default=10_000)
+    parser.add_argument('--blocks', type=int, default=10_000_000)
+    parser.add_argument('--batch-size', type=int, default=100_000)
+    parser.add_argument('--reward', type=float, default=10)
+    parser.add_argument('--compound', action='store_true', help='restake rewards after every batch')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10, help='validators to print')
+    parser.add_argument('--check', action='store_true', help='compare against the scalar week5/week7 code')
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 0 if check(seed=args.seed) else 1
+
+    rng = np.random.default_rng(args.seed)
+    own = rng.pareto(1.5, size=args.validators) * 100 + 1
+    delegations = zip(rng.integers(args.validators, size=args.delegators).tolist(),
+                      rng.integers(1, 100, size=args.delegators).tolist())
+    simulation = Simulation(own, delegations, args.reward, args.compound, args.seed)
+    simulation.run(args.blocks, args.batch_size)
+    stats = simulation.statistics()
+
+    print(f'{args.blocks} blocks, {args.validators} validators, {args.delegators} delegators')
+    print(f'Gini={stats["gini"]:.3f} HHI={stats["hhi"]:.4f} Nakamoto coefficient={stats["nakamoto"]}')
+    for v in np.argsort(-stats['final_share'])[:args.top]:
+        print(f'Validator {v}: blocks={stats["blocks"][v]} fairness={stats["fairness"][v]:.3f} '
+              f'reward/batch={stats["reward_mean"][v]:.1f}±{stats["reward_std"][v]:.1f} '
+              f'share={stats["final_share"][v]:.4f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,13 @@
 import hashlib
 import json
+import struct
+import sys
 import time
 import random
 import tkinter as tk
-import rsa
 from collections import defaultdict
+from mempool import Mempool
+from signers import Signer, address_from_der, address_of, get_signer, intern_address
 
 # ========================
 # НАСТРОЙКИ
@@ -12,69 +15,248 @@ from collections import defaultdict
 INITIAL_BALANCE = 100
 REWARD_AMOUNT_POW = 10  # Награда за PoW
 REWARD_AMOUNT_POS = 5  # Награда за PoS
+MEMPOOL_MAX_BYTES = 1_000_000  # Максимальный размер mempool (в байтах бинарной кодировки)
+BLOCK_MAX_BYTES = 100_000  # Максимальный размер транзакций в одном блоке
+DEFAULT_SIGNER = "ed25519"  # Бэкенд подписи цепочки и кошельков ("ed25519" или "rsa")
+EPOCH_LENGTH = 32  # Блоков в эпохе PoS (расписание лидеров строится раз в эпоху)
+POW_INITIAL_TARGET = 1 << 240  # Начальная цель PoW: хеш заголовка (как число) должен быть меньше
+POW_BLOCK_TIME = 2.0  # Желаемое время PoW-блока, секунд
+POW_RETARGET_INTERVAL = 10  # Пересчёт сложности каждые N PoW-блоков
 
 # ========================
-# ХЕШ-ФУНКЦИЯ & RSA
+# ХЕШ-ФУНКЦИЯ: бинарная кодировка (фиксированные поля struct + строки с префиксом длины)
 # ========================
-def hash_data(data):
-    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+TX_FIELDS = struct.Struct("<dddHH")  # amount, fee, timestamp, len(sender), len(receiver)
+BLOCK_HEADER = struct.Struct("<Qd32s32sH")  # index, timestamp, previous_hash, transactions_root, len(validator)
+NONCE = struct.Struct("<Q")  # PoW: к заголовку дописываются цель (32 байта, big-endian) и nonce
+
+def hash_bytes(previous_hash):
+    # "0" генезиса и любые короткие хеши дополняются нулями до 32 байт
+    return bytes.fromhex(previous_hash.rjust(64, "0"))
+
+# Транзакция — обычный dict, который кеширует свою бинарную кодировку и хеш.
+# Подпись (если есть) хранится в атрибутах и не входит в словарь
+class Transaction(dict):
+    __slots__ = ("_encoded", "_digest", "scheme", "public_key", "signature")
+
+    @property
+    def encoded(self):
+        try:
+            return self._encoded
+        except AttributeError:
+            sender = self["sender"].encode()
+            receiver = self["receiver"].encode()
+            self._encoded = TX_FIELDS.pack(self["amount"], self["fee"], self["timestamp"],
+                                           len(sender), len(receiver)) + sender + receiver
+            return self._encoded
+
+    @property
+    def digest(self):
+        try:
+            return self._digest
+        except AttributeError:
+            self._digest = hashlib.sha256(self.encoded).digest()
+            return self._digest
+
+def encode_block_header(index, timestamp, previous_hash, transactions, validator):
+    root = hashlib.sha256(b"".join(tx.digest for tx in transactions)).digest()
+    validator = validator.encode()
+    return BLOCK_HEADER.pack(index, timestamp, hash_bytes(previous_hash), root, len(validator)) + validator
 
+# ========================
+# КОШЕЛЁК (RSA или Ed25519)
+# ========================
 class Wallet:
-    def __init__(self):
-        self.public_key, self.private_key = rsa.newkeys(512)
+    def __init__(self, signer=DEFAULT_SIGNER):
+        self.signer = get_signer(signer)
+        self.private_key = self.signer.generate()
+        self.public_key = self.private_key.public_key()
+        self.address = address_of(self.public_key)  # 20 байт (40 hex), вычисляется один раз на ключ
 
     def get_address(self):
-        return self.public_key.save_pkcs1().decode('utf-8')
+        return self.address
+
+    def sign(self, transaction):
+        transaction.scheme = self.signer.name
+        transaction.public_key = self.signer.public_bytes(self.public_key)
+        transaction.signature = self.signer.sign(self.private_key, transaction.encoded)
+        return transaction
+
+# ========================
+# MEMPOOL (общий модуль mempool.py): ключ — хеш и размер бинарной кодировки
+# ========================
+def mempool_key(transaction):
+    return transaction.digest, len(transaction.encoded)
+
+# ========================
+# PoW: перебор nonce по бинарному заголовку
+# ========================
+# Префикс заголовка (всё, кроме nonce) хешируется один раз; для каждого nonce копируется
+# состояние SHA-256 (midstate) и дохешируются только 8 байт nonce
+class PowMiner:
+    def __init__(self):
+        self.attempts = 0
+        self.seconds = 0.0
+
+    def mine(self, prefix, target):
+        target_bytes = target.to_bytes(32, "big")
+        copy = hashlib.sha256(prefix).copy
+        pack = NONCE.pack
+        started = time.perf_counter()
+        nonce = 0
+        while True:
+            h = copy()
+            h.update(pack(nonce))
+            digest = h.digest()
+            if digest < target_bytes:
+                break
+            nonce += 1
+        self.seconds += time.perf_counter() - started
+        self.attempts += nonce + 1
+        return nonce, digest
+
+    def hashrate(self):
+        return self.attempts / self.seconds if self.seconds else 0.0
+
+def pow_prefix(index, timestamp, previous_hash, transactions, miner, target):
+    return encode_block_header(index, timestamp, previous_hash, transactions, miner) + target.to_bytes(32, "big")
+
+# ========================
+# РАСПИСАНИЕ ЛИДЕРОВ PoS (по эпохам)
+# ========================
+# Слоты эпохи распределяются пропорционально снимку стейков. ГПСЧ засеян хешем блока и номером
+# эпохи, а валидаторы отсортированы по имени, поэтому все узлы получают одно и то же расписание
+class LeaderSchedule:
+    def __init__(self, epoch, stakes, seed_hash, length=EPOCH_LENGTH):
+        self.epoch = epoch
+        self.seed_hash = seed_hash
+        names = sorted(name for name, stake in stakes.items() if stake > 0)
+        seed = int.from_bytes(hashlib.sha256(f"{seed_hash}:{epoch}".encode()).digest(), "big")
+        self.slots = random.Random(seed).choices(names, weights=[stakes[name] for name in names], k=length) if names else []
+
+    def proposer(self, slot):
+        return self.slots[slot]
 
 # ========================
 # КЛАСС БЛОКЧЕЙНА
 # ========================
 class Blockchain:
-    def __init__(self):
+    def __init__(self, signer=DEFAULT_SIGNER, validators=None):
         self.chain = []
-        self.pending_transactions = []
+        self.signer = get_signer(signer)
+        self.mempool = Mempool(mempool_key, MEMPOOL_MAX_BYTES, BLOCK_MAX_BYTES)  # ✅ Ожидающие транзакции (по комиссии)
         self.balances = defaultdict(lambda: INITIAL_BALANCE)
-        self.validators = {}
+        self.validators = dict(validators or {})  # Стейки генезиса (для эпох 0 и 1)
+        self.schedules = {}  # epoch -> LeaderSchedule (текущая и заранее построенная следующая)
         self.miners = defaultdict(int)  # ✅ Баланс для PoW-майнеров
+        self.pow_miner = PowMiner()
+        self.pow_target = POW_INITIAL_TARGET
+        self.pow_blocks = 0
+        self.pow_window_start = None  # Метка времени первого PoW-блока текущего окна
         self.create_genesis_block()
 
     def create_genesis_block(self):
         genesis_block = self.create_block([], "0", "System")
         self.chain.append(genesis_block)
-
-    def create_block(self, transactions, previous_hash, validator):
+        # Эпохи 0 и 1 идут по стейкам генезиса: их снимок зафиксирован вместе с генезисом
+        for epoch in (0, 1):
+            self.schedules[epoch] = LeaderSchedule(epoch, dict(self.validators), genesis_block["hash"])
+
+    def create_block(self, transactions, previous_hash, validator, timestamp=None, proof=None):
+        index, timestamp = len(self.chain) + 1, timestamp or time.time()
+        if proof is None:
+            block_hash = hashlib.sha256(encode_block_header(index, timestamp, previous_hash, transactions, validator)).hexdigest()
+        else:
+            block_hash = proof["hash"]
         block = {
-            "index": len(self.chain) + 1,
-            "timestamp": time.time(),
+            "index": index,
+            "timestamp": timestamp,
             "transactions": transactions,
             "previous_hash": previous_hash,
-            "hash": hash_data(transactions),
+            "hash": block_hash,
             "validator": validator
         }
+        if proof is not None:
+            block["target"], block["nonce"] = proof["target"], proof["nonce"]
+            if not self.valid_proof(block):
+                return None
         self.chain.append(block)
+        self.advance_schedules(block)
         return block
 
-    def add_transaction(self, sender, receiver, amount, fee):
+    # Проверка PoW-блока: пересчёт хеша заголовка с nonce и сравнение с целью
+    @staticmethod
+    def valid_proof(block):
+        prefix = pow_prefix(block["index"], block["timestamp"], block["previous_hash"], block["transactions"],
+                            block["validator"], block["target"])
+        digest = hashlib.sha256(prefix + NONCE.pack(block["nonce"])).digest()
+        return digest.hex() == block["hash"] and int.from_bytes(digest, "big") < block["target"]
+
+    # Каждые POW_RETARGET_INTERVAL PoW-блоков цель масштабируется на фактическое/желаемое время окна (не более чем в 4 раза).
+    # Время окна берётся из меток времени его первого и последнего PoW-блоков, поэтому все узлы считают одинаково
+    def retarget(self, block):
+        self.pow_blocks += 1
+        if self.pow_window_start is None:
+            self.pow_window_start = block["timestamp"]
+        if self.pow_blocks % POW_RETARGET_INTERVAL:
+            return
+        expected = (POW_RETARGET_INTERVAL - 1) * POW_BLOCK_TIME  # Между первым и последним блоком N - 1 интервалов
+        actual = min(max(block["timestamp"] - self.pow_window_start, expected / 4), expected * 4)
+        self.pow_target = min(int(self.pow_target * actual / expected), POW_INITIAL_TARGET << 8)
+        self.pow_window_start = None
+
+    # Подписанная транзакция должна быть подписана бэкендом цепочки; неподписанные (демо из GUI) пропускаем
+    def verify_transaction(self, transaction):
+        signature = getattr(transaction, "signature", None)
+        if signature is None:
+            return True
+        if transaction.scheme != self.signer.name or transaction["sender"] != address_from_der(transaction.public_key):
+            return False
+        return self.signer.verify(Signer.load_public(transaction.public_key), transaction.encoded, signature)
+
+    def add_transaction(self, sender, receiver, amount, fee, wallet=None):
         if self.balances[sender] < amount + fee:
             print("⚠ Недостаточно средств!")
             return None
-        transaction = {
-            "sender": sender,
-            "receiver": receiver,
-            "amount": amount,
-            "fee": fee,
-        }
-        self.pending_transactions.append(transaction)
+        transaction = Transaction(
+            sender=sender,
+            receiver=receiver,
+            amount=amount,
+            fee=fee,
+            timestamp=time.time(),
+        )
+        if wallet is not None:
+            wallet.sign(transaction)
+        if not self.verify_transaction(transaction):
+            print("⚠ Неверная подпись транзакции!")
+            return None
+        accepted, evicted = self.mempool.add(transaction)
+        for old in evicted:
+            print("⚠ Транзакция вытеснена из mempool:", old)
+        if not accepted:
+            print("⚠ Транзакция отклонена mempool (дубликат или низкая комиссия)!")
+            return None
         print("✅ Транзакция добавлена:", transaction)
         return transaction
 
     def mine_block_pow(self, miner):
-        if not self.pending_transactions:
+        if not self.mempool:
             print("⚠ Нет транзакций для майнинга!")
             return None
-        block = self.create_block(self.pending_transactions, self.chain[-1]["hash"], miner)
+        transactions = self.mempool.pop_template()
+        index, timestamp, previous_hash = len(self.chain) + 1, time.time(), self.chain[-1]["hash"]
+        prefix = pow_prefix(index, timestamp, previous_hash, transactions, miner, self.pow_target)
+        nonce, digest = self.pow_miner.mine(prefix, self.pow_target)
+        proof = {"target": self.pow_target, "nonce": nonce, "hash": digest.hex()}
+        block = self.create_block(transactions, previous_hash, miner, timestamp, proof)
+        if block is None:
+            for tx in transactions:
+                self.mempool.add(tx)
+            print("⚠ Неверное доказательство работы, блок отклонён!")
+            return None
+        self.retarget(block)
         
-        for tx in self.pending_transactions:
+        for tx in transactions:
             self.balances[tx["sender"]] -= (tx["amount"] + tx["fee"])
             self.balances[tx["receiver"]] += tx["amount"]
             self.balances[miner] += tx["fee"]
@@ -82,26 +264,47 @@ class Blockchain:
         self.miners[miner] += REWARD_AMOUNT_POW  # ✅ Минер получает награду за PoW
         print(f"✅ Майнер {miner[:6]} получил награду {REWARD_AMOUNT_POW}!")
         
-        self.pending_transactions = []
-        print("⛏ Блок добыт (PoW):", block)
+        print(f"⛏ Блок добыт (PoW), nonce={block['nonce']}, хешрейт {self.pow_miner.hashrate():.0f} H/s:", block)
         return block
 
+    # Расписание эпохи epoch + 1 строится, как только добавлен последний блок эпохи epoch - 1 (PoW или PoS):
+    # снимок стейков на этой высоте, сид — хеш этого блока. Так расписание зависит от цепочки, а не от момента вызова
+    def advance_schedules(self, block):
+        epoch, offset = divmod(len(self.chain), EPOCH_LENGTH)
+        if offset:
+            return
+        self.schedules[epoch + 1] = LeaderSchedule(epoch + 1, dict(self.validators), block["hash"])
+        self.schedules.pop(epoch - 1, None)
+
+    # Снимок без валидаторов (в демо они регистрируются уже после генезиса): расписание текущей эпохи
+    # один раз строится по стейкам на последнем блоке с его хешем в качестве сида и до конца эпохи не меняется
+    def proposer(self, height):
+        epoch, slot = divmod(height, EPOCH_LENGTH)
+        schedule = self.schedules.get(epoch)
+        if schedule is None or not schedule.slots:
+            schedule = self.schedules[epoch] = LeaderSchedule(epoch, dict(self.validators), self.chain[-1]["hash"])
+        if not schedule.slots:
+            return None
+        return schedule.proposer(slot)
+
     def mine_block_pos(self):
         if not self.validators:
             print("⚠ Нет валидаторов!")
             return None
-        total_stake = sum(self.validators.values())
-        chosen_validator = random.choices(list(self.validators.keys()), weights=self.validators.values())[0]
-        block = self.create_block(self.pending_transactions, self.chain[-1]["hash"], chosen_validator)
+        chosen_validator = self.proposer(len(self.chain))
+        if chosen_validator is None:
+            print("⚠ Нет валидаторов со стейком!")
+            return None
+        transactions = self.mempool.pop_template()
+        block = self.create_block(transactions, self.chain[-1]["hash"], chosen_validator)
 
-        for tx in self.pending_transactions:
+        for tx in transactions:
             self.balances[tx["sender"]] -= (tx["amount"] + tx["fee"])
             self.balances[tx["receiver"]] += tx["amount"]
 
         self.balances[chosen_validator] += REWARD_AMOUNT_POS  # ✅ Валидатор получает награду за PoS
         print(f"✅ Валидатор {chosen_validator[:6]} получил награду {REWARD_AMOUNT_POS}!")
 
-        self.pending_transactions = []
         print(f"⛏ Блок добыт валидатором {chosen_validator} (PoS)!")
         return block
 
@@ -114,12 +317,54 @@ class Blockchain:
         print(f"✅ {address} теперь валидатор с {stake} монет!")
         return True
 
+# ========================
+# БЕНЧМАРК КОДИРОВКИ: JSON против struct
+# ========================
+def benchmark_encoding(n=100_000):
+    rows = [dict(sender=f"user{i}", receiver=f"user{i + 1}", amount=i % 100, fee=i % 7, timestamp=time.time())
+            for i in range(n)]
+
+    started = time.perf_counter()
+    json_bytes = 0
+    for row in rows:
+        raw = json.dumps(row, sort_keys=True, default=str).encode()
+        hashlib.sha256(raw).hexdigest()
+        json_bytes += len(raw)
+    json_rate = n / (time.perf_counter() - started)
+
+    transactions = [Transaction(row) for row in rows]
+    started = time.perf_counter()
+    binary_bytes = sum(len(tx.encoded) for tx in transactions if tx.digest)
+    binary_rate = n / (time.perf_counter() - started)
+
+    print(f"{n} транзакций: JSON {json_bytes / n:.0f} байт, {json_rate:.0f} хешей/с; "
+          f"struct {binary_bytes / n:.0f} байт, {binary_rate:.0f} хешей/с")
+
+# Стоимость одной попытки: JSON всего блока против midstate + 8 байт nonce
+def benchmark_pow(attempts=200_000, transactions=100):
+    rows = [Transaction(sender=f"user{i}", receiver=f"user{i + 1}", amount=i, fee=1, timestamp=time.time())
+            for i in range(transactions)]
+    block = {"index": 1, "timestamp": time.time(), "transactions": rows, "previous_hash": "0" * 64,
+             "validator": "Miner", "nonce": 0}
+
+    started = time.perf_counter()
+    for nonce in range(attempts // 100):
+        block["nonce"] = nonce
+        hashlib.sha256(json.dumps(block, sort_keys=True, default=str).encode()).digest()
+    json_cost = (time.perf_counter() - started) / (attempts // 100)
+
+    miner = PowMiner()
+    target = 1 << 238  # ~2^18 попыток
+    miner.mine(pow_prefix(1, time.time(), "0" * 64, rows, "Miner", target), target)
+    print(f"JSON: {json_cost * 1e6:.1f} мкс/попытка; midstate: {1e6 / miner.hashrate():.2f} мкс/попытка "
+          f"({miner.hashrate():.0f} H/s, {miner.attempts} попыток)")
+
 # ========================
 # ФУНКЦИИ ДЛЯ TKINTER
 # ========================
 def send_transaction():
-    sender = entry_sender.get()
-    receiver = entry_receiver.get()
+    sender = intern_address(entry_sender.get())
+    receiver = intern_address(entry_receiver.get())
     amount = float(entry_amount.get())
     fee = float(entry_fee.get())
     blockchain.add_transaction(sender, receiver, amount, fee)
@@ -134,7 +379,7 @@ def do_pos_mine():
     update_block_explorer()
 
 def register_validator():
-    address = entry_validator.get()
+    address = intern_address(entry_validator.get())
     stake = float(entry_stake.get())
     blockchain.register_validator(address, stake)
     update_block_explorer()
@@ -156,55 +401,61 @@ def update_block_explorer():
 # ========================
 # СОЗДАНИЕ GUI
 # ========================
-root = tk.Tk()
-root.title("Blockchain Wallet & Explorer")
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        benchmark_encoding()
+        benchmark_pow()
+        sys.exit()
+
+    root = tk.Tk()
+    root.title("Blockchain Wallet & Explorer")
 
-# Поля для транзакции
-tk.Label(root, text="Отправитель:").grid(row=0, column=0)
-entry_sender = tk.Entry(root)
-entry_sender.grid(row=0, column=1)
+    # Поля для транзакции
+    tk.Label(root, text="Отправитель:").grid(row=0, column=0)
+    entry_sender = tk.Entry(root)
+    entry_sender.grid(row=0, column=1)
 
-tk.Label(root, text="Получатель:").grid(row=1, column=0)
-entry_receiver = tk.Entry(root)
-entry_receiver.grid(row=1, column=1)
+    tk.Label(root, text="Получатель:").grid(row=1, column=0)
+    entry_receiver = tk.Entry(root)
+    entry_receiver.grid(row=1, column=1)
 
-tk.Label(root, text="Сумма:").grid(row=2, column=0)
-entry_amount = tk.Entry(root)
-entry_amount.grid(row=2, column=1)
+    tk.Label(root, text="Сумма:").grid(row=2, column=0)
+    entry_amount = tk.Entry(root)
+    entry_amount.grid(row=2, column=1)
 
-tk.Label(root, text="Комиссия:").grid(row=3, column=0)
-entry_fee = tk.Entry(root)
-entry_fee.insert(0, "1")
-entry_fee.grid(row=3, column=1)
+    tk.Label(root, text="Комиссия:").grid(row=3, column=0)
+    entry_fee = tk.Entry(root)
+    entry_fee.insert(0, "1")
+    entry_fee.grid(row=3, column=1)
 
-send_btn = tk.Button(root, text="Отправить транзакцию", command=send_transaction)
-send_btn.grid(row=4, column=0, columnspan=2)
+    send_btn = tk.Button(root, text="Отправить транзакцию", command=send_transaction)
+    send_btn.grid(row=4, column=0, columnspan=2)
 
-# Поля для майнинга
-mine_pow_btn = tk.Button(root, text="Майнинг (PoW)", command=do_pow_mine)
-mine_pow_btn.grid(row=5, column=0)
+    # Поля для майнинга
+    mine_pow_btn = tk.Button(root, text="Майнинг (PoW)", command=do_pow_mine)
+    mine_pow_btn.grid(row=5, column=0)
 
-mine_pos_btn = tk.Button(root, text="Майнинг (PoS)", command=do_pos_mine)
-mine_pos_btn.grid(row=5, column=1)
+    mine_pos_btn = tk.Button(root, text="Майнинг (PoS)", command=do_pos_mine)
+    mine_pos_btn.grid(row=5, column=1)
 
-# Поля для регистрации валидатора
-tk.Label(root, text="Валидатор:").grid(row=6, column=0)
-entry_validator = tk.Entry(root)
-entry_validator.grid(row=6, column=1)
+    # Поля для регистрации валидатора
+    tk.Label(root, text="Валидатор:").grid(row=6, column=0)
+    entry_validator = tk.Entry(root)
+    entry_validator.grid(row=6, column=1)
 
-tk.Label(root, text="Стейк:").grid(row=7, column=0)
-entry_stake = tk.Entry(root)
-entry_stake.grid(row=7, column=1)
+    tk.Label(root, text="Стейк:").grid(row=7, column=0)
+    entry_stake = tk.Entry(root)
+    entry_stake.grid(row=7, column=1)
 
-register_validator_btn = tk.Button(root, text="Зарегистрировать валидатора", command=register_validator)
-register_validator_btn.grid(row=8, column=0, columnspan=2)
+    register_validator_btn = tk.Button(root, text="Зарегистрировать валидатора", command=register_validator)
+    register_validator_btn.grid(row=8, column=0, columnspan=2)
 
-# Окно Block Explorer
-tk.Label(root, text="Блок Эксплорер").grid(row=9, column=0, columnspan=2)
-explorer_text = tk.Text(root, width=60, height=15)
-explorer_text.grid(row=10, column=0, columnspan=2)
+    # Окно Block Explorer
+    tk.Label(root, text="Блок Эксплорер").grid(row=9, column=0, columnspan=2)
+    explorer_text = tk.Text(root, width=60, height=15)
+    explorer_text.grid(row=10, column=0, columnspan=2)
 
-blockchain = Blockchain()
-update_block_explorer()
+    blockchain = Blockchain()
+    update_block_explorer()
 
-root.mainloop()
+    root.mainloop()